@@ -1,3 +1,5 @@
+import logging
+
 import chromadb
 import httpx
 from chromadb.config import Settings
@@ -5,6 +7,8 @@ from chromadb.utils import embedding_functions
 
 from lib.settings import settings
 
+logger = logging.getLogger(__name__)
+
 # Single unified collection name for all embeddings
 UNIFIED_COLLECTION_NAME = "collection"
 
@@ -45,9 +49,34 @@ else:
     embedding_function = None
 
 
+_unified_collection = None
+
+
 def get_unified_collection():
-    """Get or create the unified collection for all embeddings."""
-    return chroma_client.get_or_create_collection(
-        UNIFIED_COLLECTION_NAME,
-        embedding_function=embedding_function,  # type: ignore
-    )
+    """Get or create the unified collection for all embeddings.
+
+    The collection is created on first use and reused afterwards.
+    """
+    global _unified_collection
+    if _unified_collection is None:
+        _unified_collection = chroma_client.get_or_create_collection(
+            UNIFIED_COLLECTION_NAME,
+            embedding_function=embedding_function,  # type: ignore
+        )
+    return _unified_collection
+
+
+def warmup_embedding() -> None:
+    """Create the collection and run a single embedding call.
+
+    This sets up the HTTP connection of the embedding function up front, so
+    the first document saved does not pay for it.
+    """
+    get_unified_collection()
+    if embedding_function is None:
+        return
+
+    try:
+        embedding_function(["warmup"])
+    except Exception as e:
+        logger.warning("Embedding warmup failed: %s", e)
@@ -1,4 +1,6 @@
+import json
 from functools import lru_cache
+from typing import Any
 
 import pycouchdb
 import pycouchdb.exceptions
@@ -50,6 +52,38 @@ def create_user_index(db: pycouchdb.client.Database):
         db.save(design_doc)
 
 
+def create_mention_pages_view(db: pycouchdb.client.Database):
+    # Compact variant of mentions/by_user: keyed by username, emits the page
+    # metadata needed for the mention statistics as value, so it can be
+    # queried by key without docs
+    map_function = r"""
+    function(doc) {
+        if (doc.content) {
+            const regex = /mention:\/\/user\/([A-Za-z0-9_.-]+)/g;
+            const ocs = doc.ocs || {};
+
+            for (const match of doc.content.matchAll(regex)) {
+                emit(match[1], {
+                    page_id: ocs.id || null,
+                    title: ocs.title || null,
+                    subtype: doc.subtype || null
+                });
+            }
+        }
+    }
+    """
+
+    DESIGN_DOC_ID = "_design/mention_pages"
+    design_doc = {
+        "_id": DESIGN_DOC_ID,
+        "language": "javascript",
+        "views": {"by_user": {"map": map_function}},
+    }
+
+    if DESIGN_DOC_ID not in db:
+        db.save(design_doc)
+
+
 def create_indizes_if_not_exist(db: pycouchdb.client.Database):
     indizes = [
         {
@@ -91,6 +125,11 @@ def create_indizes_if_not_exist(db: pycouchdb.client.Database):
             "name": "idx_type_updated_at",
             "type": "json",
         },
+        {
+            "index": {"fields": ["type", "name"]},
+            "name": "idx_type_name",
+            "type": "json",
+        },
     ]
 
     # CouchDB will return 200 if index exists or create it otherwise.
@@ -125,5 +164,21 @@ def couchdb() -> pycouchdb.client.Database:
 
     create_indizes_if_not_exist(db)
     create_user_index(db)
+    create_mention_pages_view(db)
 
     return db
+
+
+def find(lookup: dict) -> dict[str, Any]:
+    """Run a Mango `_find` query and return the decoded response.
+
+    The request body is serialized compactly and the response is decoded
+    once from the raw bytes.
+    """
+    response, _result = couchdb().resource.post(
+        "_find",
+        data=json.dumps(lookup, separators=(",", ":")),
+        stream=True,
+    )
+    response.raise_for_status()
+    return json.loads(response.content)
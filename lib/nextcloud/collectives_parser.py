@@ -28,13 +28,19 @@ from lib.nextcloud.models.protocol import Protocol
 logger = logging.getLogger(__name__)
 
 
-def parse_groups(page: CollectivePage) -> None:
-    """Parse metadata from the markdown content."""
+def parse_groups(page: CollectivePage, save: bool = True) -> Group | None:
+    """
+    Parse metadata from the markdown content.
+
+    Returns the updated group, if the page is a group page. With save=False
+    the group is not saved, so several groups can be saved with
+    Group.save_many.
+    """
 
     config = bot_config or BotConfig.load_config()
 
     if not page.content or not page.ocs or not config:
-        return
+        return None
 
     if Group.valid_name(page.title):
         if page.subtype != PageSubtype.GROUP:
@@ -47,7 +53,10 @@ def parse_groups(page: CollectivePage) -> None:
                 group = Group.get(group.build_id())
             except NotFound:
                 pass
-            group.update_from_page()
+            group.update_from_page(save=save)
+            return group
+
+    return None
 
 
 def parse_protocols(page: CollectivePage) -> None:
@@ -56,19 +65,7 @@ def parse_protocols(page: CollectivePage) -> None:
     if not page.content or not page.ocs or not config:
         return
 
-    protocol_kws = set(config.organisation.protocol_subtype_keywords)
-
-    if (
-        len(page.ocs.filePath.split("/")) > 1
-        and (
-            page.is_readme and page.ocs.filePath.split("/")[-2].lower() in protocol_kws
-        )
-        or (
-            not page.is_readme
-            and page.ocs.filePath.split("/")[-1].lower() in protocol_kws
-        )
-        # and Protocol.valid_title(page.title)
-    ):
+    if Protocol.is_protocol_page(page):
         if page.subtype != PageSubtype.PROTOCOL:
             page.subtype = PageSubtype.PROTOCOL
             page.save()
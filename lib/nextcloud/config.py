@@ -4,7 +4,8 @@ import logging
 import re
 import threading
 import time
-from typing import Dict, List, Optional
+from functools import cached_property
+from typing import Dict, FrozenSet, List, Optional
 
 import yaml
 from pydantic import BaseModel, Field, field_validator
@@ -14,6 +15,9 @@ from lib.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# opening fence ```, optional language marker until newline, then capture until closing fence
+yaml_block_regex = re.compile(r"```(?:[^\n]*\n)?(.*?)```", re.DOTALL)
+
 
 class OrganisationConfig(BaseModel):
     group_prefixes: List[str] = Field(default_factory=lambda: ["AG", "UG", "PG"])
@@ -102,6 +106,75 @@ class OrganisationConfig(BaseModel):
         # convert keys and values to uppercase
         return {k.upper(): [name.upper() for name in vlist] for k, vlist in v.items()}
 
+    @cached_property
+    def protocol_subtype_keyword_set(self) -> FrozenSet[str]:
+        """Lowercased protocol subtype keywords for membership checks."""
+        return frozenset(kw.lower() for kw in self.protocol_subtype_keywords)
+
+    @cached_property
+    def moderation_person_keyword_set(self) -> FrozenSet[str]:
+        """Lowercased moderation person keywords for membership checks."""
+        return frozenset(kw.lower() for kw in self.moderation_person_keywords)
+
+    @cached_property
+    def protocol_person_keyword_set(self) -> FrozenSet[str]:
+        """Lowercased protocol person keywords for membership checks."""
+        return frozenset(kw.lower() for kw in self.protocol_person_keywords)
+
+    @cached_property
+    def participant_person_keyword_set(self) -> FrozenSet[str]:
+        """Lowercased participant person keywords for membership checks."""
+        return frozenset(kw.lower() for kw in self.participant_person_keywords)
+
+    @cached_property
+    def coordination_person_keyword_set(self) -> FrozenSet[str]:
+        """Lowercased coordination person keywords for membership checks."""
+        return frozenset(kw.lower() for kw in self.coordination_person_keywords)
+
+    @cached_property
+    def delegate_person_keyword_set(self) -> FrozenSet[str]:
+        """Lowercased delegate person keywords for membership checks."""
+        return frozenset(kw.lower() for kw in self.delegate_person_keywords)
+
+    @cached_property
+    def member_person_keyword_set(self) -> FrozenSet[str]:
+        """Lowercased member person keywords for membership checks."""
+        return frozenset(kw.lower() for kw in self.member_person_keywords)
+
+    @cached_property
+    def group_shortname_keyword_set(self) -> FrozenSet[str]:
+        """Lowercased group short name keywords for membership checks."""
+        return frozenset(kw.lower() for kw in self.group_shortname_keywords)
+
+    @cached_property
+    def group_keyword_dispatch(self) -> Dict[str, str]:
+        """
+        Map the lowercased group page keywords to the Group field they
+        introduce. A keyword configured for several fields is resolved in
+        the order coordination, delegate, members, short names.
+        """
+        dispatch = dict.fromkeys(self.group_shortname_keyword_set, "short_names")
+        dispatch.update(dict.fromkeys(self.member_person_keyword_set, "members"))
+        dispatch.update(dict.fromkeys(self.delegate_person_keyword_set, "delegate"))
+        dispatch.update(
+            dict.fromkeys(self.coordination_person_keyword_set, "coordination")
+        )
+        return dispatch
+
+    @cached_property
+    def protocol_keyword_dispatch(self) -> Dict[str, str]:
+        """
+        Map the lowercased protocol page keywords to the Protocol field they
+        introduce. A keyword configured for several fields is resolved in
+        the order moderation, protocol, participants.
+        """
+        dispatch = dict.fromkeys(self.participant_person_keyword_set, "participants")
+        dispatch.update(dict.fromkeys(self.protocol_person_keyword_set, "protocol_by"))
+        dispatch.update(
+            dict.fromkeys(self.moderation_person_keyword_set, "moderated_by")
+        )
+        return dispatch
+
 
 class AvatarConfig(BaseModel):
     fetch_avatar: bool = True
@@ -202,8 +275,7 @@ def extract_yaml_block(content: str) -> Optional[str]:
     if not content:
         return None
 
-    # Regex: opening fence ```, optional language marker until newline, then capture until closing fence
-    m = re.search(r"```(?:[^\n]*\n)?(.*?)```", content, flags=re.DOTALL)
+    m = yaml_block_regex.search(content)
     if not m:
         return None
 
@@ -1,20 +1,58 @@
 import logging
+import re
 import threading
 from collections import OrderedDict
 from datetime import datetime
 from functools import cached_property
-from typing import Any, ClassVar, List, Type, TypeVar
+from typing import Any, ClassVar, Dict, Iterator, List, Sequence, Tuple, Type, TypeVar
 
 import pytz
 from pycouchdb.exceptions import Conflict
 from pydantic import BaseModel
 
-from lib.couchdb import couchdb
+from lib.couchdb import couchdb, find
 from lib.settings import settings
 
 logger = logging.getLogger(__name__)
 
-T = TypeVar("T")
+T = TypeVar("T", bound="CouchDBModel")
+
+# Either the (lookahead) first word at the start of a line or a user mention
+# as matched by `lib.settings.user_regex`. The lookahead is zero-width, so a
+# mention at the very start of a line is still matched as a user afterwards.
+line_token_regex = re.compile(
+    r"^(?=[^\w\n]*(?P<word>\w[\w-]*)\b)|mention://user/(?P<user>[A-Za-z0-9_.-]+)",
+    re.MULTILINE,
+)
+
+
+def scan_lines(content: str) -> Iterator[Tuple[str, List[str], int]]:
+    """
+    Scan the content in a single regex pass.
+
+    Yields a tuple (first_word, users, line_start) for every line containing
+    a word, where first_word is lowercased, users are the mentioned usernames
+    in that line and line_start is the offset of the line within content.
+    """
+    first_word: str | None = None
+    users: List[str] = []
+    line_start = 0
+
+    for m in line_token_regex.finditer(content):
+        user = m.group("user")
+        if user is not None:
+            users.append(user)
+            continue
+
+        if first_word is not None:
+            yield first_word, users, line_start
+
+        first_word = m.group("word").lower()
+        users = []
+        line_start = m.start()
+
+    if first_word is not None:
+        yield first_word, users, line_start
 
 
 def format_timestamp(timestamp: int | None) -> str | None:
@@ -83,6 +121,23 @@ class CouchDBModel(BaseModel):
         with CouchDBModel._cache_lock:
             CouchDBModel._instance_cache.clear()
 
+    @classmethod
+    def _type_selector(cls, selector: dict | None) -> dict:
+        """Restrict the selector to this model type, which cannot be overridden."""
+        return (selector or {}) | {"type": cls.__name__}
+
+    @classmethod
+    def from_doc(cls: Type[T], doc: dict) -> T:
+        """Build an instance from a document loaded from CouchDB."""
+        # the stored id and rev fields lag behind, _id and _rev are current
+        return cls(
+            **{
+                **doc,
+                "id": doc.get("_id", doc.get("id")),
+                "rev": doc.get("_rev", doc.get("rev")),
+            }
+        )
+
     @cached_property
     def type(self) -> str:
         """Return the runtime type name of this model (e.g. 'NCUser')."""
@@ -128,6 +183,52 @@ class CouchDBModel(BaseModel):
         # update cache
         self._cache_add(self)
 
+    @classmethod
+    def save_many(
+        cls,
+        instances: Sequence["CouchDBModel"],
+        skip_set_updated_at: bool = False,
+        batch_size: int = 200,
+    ) -> None:
+        """
+        Save several instances with one `_bulk_docs` request per batch.
+        Overrides of `save` in subclasses are not called.
+        """
+        db = couchdb()
+        updated_at = int(datetime.now().timestamp())
+
+        for start in range(0, len(instances), batch_size):
+            batch = instances[start : start + batch_size]
+
+            docs = []
+            for inst in batch:
+                if not skip_set_updated_at:
+                    inst.updated_at = updated_at
+                if not inst.id:
+                    inst.id = inst.build_id()
+                doc = inst.model_dump()
+                doc["type"] = inst.type
+                doc["_id"] = inst.id
+                docs.append(doc)
+
+            # look up the current revisions, the ones on the instances may be stale
+            rows = db.all(
+                keys=[d["_id"] for d in docs], include_docs="false", as_list=True
+            )
+            revs = {
+                row["id"]: row["value"]["rev"]
+                for row in rows
+                if "value" in row and not row["value"].get("deleted")
+            }
+            for doc in docs:
+                if doc["_id"] in revs:
+                    doc["_rev"] = revs[doc["_id"]]
+
+            saved_docs = db.save_bulk(docs, transaction=False)
+            for inst, saved_doc in zip(batch, saved_docs):
+                inst.rev = saved_doc.get("_rev", inst.rev)
+                cls._cache_add(inst)
+
     def delete(self) -> None:
         """Delete the current instance from CouchDB."""
         db = couchdb()
@@ -140,6 +241,37 @@ class CouchDBModel(BaseModel):
         self._cache_invalidate(self.id)
         logger.info("Deleted document %s from CouchDB", self.id)
 
+    @classmethod
+    def bulk_delete(
+        cls, selector: dict | None = None, batch_size: int = 1000
+    ) -> List[dict]:
+        """
+        Delete all documents of this model type matching the selector with one
+        `_bulk_docs` request per batch. Returns the deleted documents.
+        """
+        lookup = {
+            "selector": cls._type_selector(selector),
+            "limit": batch_size,
+        }
+        # collect all matches first, deleting while paging would shift the bookmark
+        docs = list(cls._find_docs(lookup))
+        if not docs:
+            return []
+
+        db = couchdb()
+        for start in range(0, len(docs), batch_size):
+            db.delete_bulk(
+                [
+                    {"_id": d["_id"], "_rev": d["_rev"]}
+                    for d in docs[start : start + batch_size]
+                ],
+                transaction=False,
+            )
+        for d in docs:
+            cls._cache_invalidate(d["_id"])
+        logger.info("Deleted %d %s documents from CouchDB", len(docs), cls.__name__)
+        return docs
+
     @classmethod
     def get(cls, doc_id: str) -> "CouchDBModel":
         """Get a document by its id from CouchDB."""
@@ -154,35 +286,100 @@ class CouchDBModel(BaseModel):
             return cached
 
         doc = db.get(doc_id)
-        inst = cls(**doc)
+        inst = cls.from_doc(doc)
         cls._cache_add(inst)
         return inst
 
+    @classmethod
+    def get_many(cls: Type[T], doc_ids: List[str]) -> Dict[str, T]:
+        """Get several documents by id with a single CouchDB query.
+
+        Ids that are cached are not queried again, missing ids are left out
+        of the result.
+        """
+        result: Dict[str, T] = {}
+        missing = []
+        for doc_id in dict.fromkeys(doc_ids):
+            cached = cls._cache_get(doc_id)  # type: ignore[attr-defined]
+            if cached and isinstance(cached, cls):
+                result[doc_id] = cached
+            else:
+                missing.append(doc_id)
+
+        if missing:
+            lookup = {
+                "selector": {"_id": {"$in": missing}},
+                "limit": len(missing),
+            }
+            results = find(lookup)
+
+            for doc in results.get("docs", []):
+                inst = cls.from_doc(doc)
+                cls._cache_add(inst)  # type: ignore[attr-defined]
+                result[doc["_id"]] = inst
+
+        return result
+
     @classmethod
     def get_all(
         cls,
         limit: int = 100,
-        sort: List[str | dict] = [{"updated_at": "desc"}],
+        sort: List[str | dict] | None = None,
         selector: dict | None = None,
     ) -> List["CouchDBModel"]:
         """Load all documents of this model type from CouchDB."""
-        db = couchdb()
-
         lookup = {
-            "selector": {"type": cls.__name__} | (selector or {}),
-            "sort": sort,
+            "selector": cls._type_selector(selector),
+            "sort": list(sort) if sort is not None else [{"updated_at": "desc"}],
             "limit": limit,
         }
-        response, results = db.resource.post("_find", json=lookup)
-        response.raise_for_status()
+        results = find(lookup)
 
-        return [cls(**d) for d in results.get("docs", [])]
+        return [cls.from_doc(d) for d in results.get("docs", [])]
+
+    @classmethod
+    def iter_all(
+        cls: Type[T],
+        batch_size: int = 200,
+        sort: List[str | dict] | None = None,
+        selector: dict | None = None,
+    ) -> Iterator[T]:
+        """Iterate over all documents of this model type.
+
+        Documents are fetched in batches of `batch_size` using the bookmark
+        returned by CouchDB, so the result is not truncated by a fixed limit.
+        """
+        lookup: dict[str, Any] = {
+            "selector": cls._type_selector(selector),
+            "limit": batch_size,
+        }
+        if sort:
+            lookup["sort"] = sort
+
+        for d in cls._find_docs(lookup):
+            yield cls.from_doc(d)
+
+    @staticmethod
+    def _find_docs(lookup: dict) -> Iterator[dict]:
+        """
+        Yield all documents matching the lookup, fetching `lookup["limit"]`
+        documents per request and following the bookmark returned by CouchDB.
+        """
+        lookup = dict(lookup)
+        while True:
+            results = find(lookup)
+
+            docs = results.get("docs", [])
+            yield from docs
+
+            bookmark = results.get("bookmark")
+            if len(docs) < lookup["limit"] or not bookmark:
+                break
+            lookup["bookmark"] = bookmark
 
     @classmethod
     def get_by(cls: Type[T], key: str, value: Any) -> List[T]:
         """Get a list of models by a key-value pair."""
-        db = couchdb()
-        lookup = {"selector": {"type": cls.__name__, key: value}}
-        response, results = db.resource.post("_find", json=lookup)
-        response.raise_for_status()
-        return [cls(**doc) for doc in results.get("docs", [])]
+        lookup = {"selector": cls._type_selector({key: value})}
+        results = find(lookup)
+        return [cls.from_doc(doc) for doc in results.get("docs", [])]
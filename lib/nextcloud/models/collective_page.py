@@ -1,3 +1,5 @@
+import hashlib
+import json
 import logging
 from enum import Enum
 from functools import cached_property
@@ -7,7 +9,7 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from pydantic import BaseModel
 
 from lib.chromadb import embedding_function, get_unified_collection
-from lib.couchdb import couchdb
+from lib.couchdb import couchdb, find
 from lib.nextcloud.models.base import (
     CouchDBModel,
     format_timestamp,
@@ -17,6 +19,9 @@ from lib.settings import settings
 logger = logging.getLogger(__name__)
 
 
+# Maximum number of chunks sent to ChromaDB in one upsert request
+UPSERT_BATCH_SIZE = 100
+
 # Text splitter for chunking long documents
 text_splitter = RecursiveCharacterTextSplitter(
     chunk_size=800,
@@ -60,6 +65,9 @@ class CollectivePage(CouchDBModel):
     subtype: PageSubtype | None = None
     tags: List[str] = []
 
+    # hash of content and metadata of the last ChromaDB upsert
+    content_hash: str = ""
+
     def __str__(self) -> str:
         return f"CollectivePage(id={self.id}, title={self.title})"
 
@@ -124,9 +132,12 @@ class CollectivePage(CouchDBModel):
     @classmethod
     def get_from_page_id(cls, page_id: int) -> "CollectivePage":
         """Load the latest content from the database into this instance."""
-        return cast(
-            CollectivePage,
-            cls.get(CollectivePage(ocs=OCSCollectivePage(id=page_id)).build_id()),
+        if not page_id:
+            raise ValueError("ocs.id is required to build CollectivePage id")
+        # same id as build_id(), without constructing a throwaway model; the
+        # lookup is then served from the instance cache in CouchDBModel.get
+        return cls.get(
+            f"{CollectivePage.__name__}:{settings.nextcloud.collectives_id}:{page_id}"
         )
 
     @classmethod
@@ -140,43 +151,71 @@ class CollectivePage(CouchDBModel):
         return cast(List[CollectivePage], super().get_all(*args, **kwargs))
 
     def save(self, skip_set_updated_at: bool = False) -> None:
-        from lib.nextcloud.models.group import Group
-
         super().save(skip_set_updated_at=skip_set_updated_at)
 
         if embedding_function is None:
             return
 
-        # Update ChromaDB collection with text splitting
-        if self.ocs and self.content and self.content.strip():
-            collection = get_unified_collection()
+        previous_hash = self.content_hash
+        self.update_embedding()
 
-            try:
-                group = Group.get_for_page(self)
-            except ValueError:
-                group = None
-
-            # Split long documents into chunks for better embeddings
-            chunks = text_splitter.split_text(self.content)
-
-            for i in range(len(chunks)):
-                collection.upsert(
-                    ids=[f"{self.build_id()}_chunk_{i}"],
-                    documents=[chunks[i]],
-                    metadatas=[
-                        {
-                            "source_type": self.type,
-                            "page_id": self.ocs.id,
-                            "title": self.ocs.title,
-                            "timestamp": self.ocs.timestamp or 0,
-                            "subtype": self.subtype or "",
-                            "group_id": group.build_id() if group else "",
-                            "chunk_index": i,
-                            "total_chunks": len(chunks),
-                            "original_doc_id": self.build_id(),
-                        },
-                    ],
-                )
+        # persist the hash of the successful upsert with the page
+        if self.content_hash != previous_hash:
+            super().save(skip_set_updated_at=True)
+
+    def update_embedding(self) -> None:
+        """Upsert the content chunks into the ChromaDB unified collection.
+
+        Nothing is sent when content and metadata are unchanged since the last
+        upsert, so re-saving an unchanged page does not re-embed it.
+        """
+        from lib.nextcloud.models.group import Group
+
+        if not self.ocs or not self.content or not self.content.strip():
+            return
+
+        try:
+            group = Group.get_for_page(self)
+        except ValueError:
+            group = None
+
+        doc_id = self.build_id()
+        metadata = {
+            "source_type": self.type,
+            "page_id": self.ocs.id,
+            "title": self.ocs.title,
+            "timestamp": self.ocs.timestamp or 0,
+            "subtype": self.subtype or "",
+            "group_id": group.build_id() if group else "",
+            "original_doc_id": doc_id,
+        }
+
+        hasher = hashlib.blake2b(self.content.encode(), digest_size=16)
+        hasher.update(json.dumps(metadata, sort_keys=True).encode())
+        new_hash = hasher.hexdigest()
+        if new_hash == self.content_hash:
+            return
+
+        # Split long documents into chunks for better embeddings
+        chunks = text_splitter.split_text(self.content)
+
+        ids = [f"{doc_id}_chunk_{i}" for i in range(len(chunks))]
+        metadatas = [
+            {**metadata, "chunk_index": i, "total_chunks": len(chunks)}
+            for i in range(len(chunks))
+        ]
+
+        # upsert the chunks in batches instead of one request per chunk
+        collection = get_unified_collection()
+        for start in range(0, len(chunks), UPSERT_BATCH_SIZE):
+            end = start + UPSERT_BATCH_SIZE
+            collection.upsert(
+                ids=ids[start:end],
+                documents=chunks[start:end],
+                metadatas=metadatas[start:end],  # type: ignore
+            )
+
+        self.content_hash = new_hash
 
     def delete(self) -> None:
         """Delete the page and all related objects (Decisions, Protocol, Group) and ChromaDB entries."""
@@ -192,8 +231,7 @@ class CollectivePage(CouchDBModel):
                 "selector": {"page_id": page_id},
                 "limit": 10000,
             }
-            response, results = db.resource.post("_find", json=lookup)
-            response.raise_for_status()
+            results = find(lookup)
 
             # Delete each related document
             for doc in results.get("docs", []):
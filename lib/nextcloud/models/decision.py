@@ -1,11 +1,15 @@
+import hashlib
+import json
+import logging
 from functools import cached_property
-from typing import List, cast
-
+from typing import Any, List, cast
 
 from lib.chromadb import embedding_function, get_unified_collection
-from lib.couchdb import couchdb
+from lib.couchdb import find
 from lib.nextcloud.models.base import CouchDBModel
-from lib.nextcloud.models.collective_page import CollectivePage
+from lib.nextcloud.models.collective_page import CollectivePage, OCSCollectivePage
+
+logger = logging.getLogger(__name__)
 
 
 class Decision(CouchDBModel):
@@ -22,14 +26,49 @@ class Decision(CouchDBModel):
 
     external_link: str = ""
 
+    # hash of the embedded content, used to skip re-embedding unchanged text
+    content_hash: str = ""
+    # hash of the ChromaDB metadata, used to skip unchanged metadata updates
+    metadata_hash: str = ""
+
     def build_id(self) -> str:
         if not self.title and not self.text:
             raise ValueError("Decision must have either a title or text to build ID")
         return f"{self.__class__.__name__}:{self.page_id}:{self.title[0:20] if self.title else self.text[0:20]}"
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name in ("title", "text", "page_id"):
+            # the cached id and lowercased texts depend on these fields
+            for cached in ("id_str", "title_lower", "text_lower"):
+                self.__dict__.pop(cached, None)
+
+    @cached_property
+    def id_str(self) -> str:
+        """Return the cached result of build_id()."""
+        return self.build_id()
+
+    @cached_property
+    def title_lower(self) -> str:
+        return self.title.lower()
+
+    @cached_property
+    def text_lower(self) -> str:
+        return self.text.lower()
+
     def __contains__(self, item: str) -> bool:
         item_lower = item.lower().strip()
-        return item_lower in self.title.lower() or item_lower in self.text.lower()
+        return item_lower in self.title_lower or item_lower in self.text_lower
+
+    @staticmethod
+    def filter_containing(decisions: List["Decision"], term: str) -> List["Decision"]:
+        """Return the decisions whose title or text contains the term."""
+        term_lower = term.lower().strip()
+        return [
+            d
+            for d in decisions
+            if term_lower in d.title_lower or term_lower in d.text_lower
+        ]
 
     @cached_property
     def page(self) -> CollectivePage | None:
@@ -40,6 +79,23 @@ class Decision(CouchDBModel):
                 return None
         return None
 
+    @classmethod
+    def prefetch_pages(cls, decisions: List["Decision"]) -> None:
+        """Load the pages of all given decisions with a single query."""
+        page_ids = {
+            d.page_id: CollectivePage(ocs=OCSCollectivePage(id=d.page_id)).build_id()
+            for d in decisions
+            if d.page_id and "page" not in d.__dict__
+        }
+        if not page_ids:
+            return
+
+        pages = CollectivePage.get_many(list(page_ids.values()))
+        for d in decisions:
+            if d.page_id in page_ids:
+                # seed the cached_property
+                d.__dict__["page"] = pages.get(page_ids[d.page_id])
+
     @classmethod
     def get_all(  # type: ignore[override]
         cls, *args, **kwargs
@@ -51,49 +107,81 @@ class Decision(CouchDBModel):
         cls,
         limit: int,
         skip: int,
-        sort: List[str | dict] = [{"updated_at": "desc"}],
+        sort: List[str | dict] | None = None,
         selector: dict | None = None,
     ) -> List["Decision"]:
-        db = couchdb()
-
         lookup = {
-            "selector": {"type": cls.__name__} | (selector or {}),
-            "sort": sort,
+            "selector": cls._type_selector(selector),
+            "sort": list(sort) if sort is not None else [{"updated_at": "desc"}],
             "limit": limit,
             "skip": skip,
         }
-        response, results = db.resource.post("_find", json=lookup)
-        response.raise_for_status()
+        results = find(lookup)
 
         return [cls(**d) for d in results.get("docs", [])]
 
+    @classmethod
+    def bulk_delete(
+        cls, selector: dict | None = None, batch_size: int = 1000
+    ) -> List[dict]:
+        docs = super().bulk_delete(selector=selector, batch_size=batch_size)
+
+        # Remove from ChromaDB unified collection
+        ids = [cls(**d).id_str for d in docs if d.get("title") or d.get("text")]
+        if ids:
+            get_unified_collection().delete(ids=ids)
+        return docs
+
     def save(self, skip_set_updated_at: bool = False) -> None:
+        if embedding_function is not None and (self.title or self.text):
+            self.update_embedding()
+
         super().save(skip_set_updated_at=skip_set_updated_at)
 
-        if embedding_function is None:
+    def update_embedding(self) -> None:
+        """Update the ChromaDB unified collection.
+
+        The document is only re-embedded when title or text changed, otherwise
+        just the metadata is updated if it changed. The hashes are only set
+        once the collection call succeeded, so a failed update is retried on
+        the next save.
+        """
+        metadata = {
+            "source_type": self.type,
+            "page_id": self.page_id,
+            "title": self.title,
+            "date": self.date,
+            "group_name": self.group_name,
+        }
+
+        document = f"{self.title}\n{self.text}"
+        new_hash = hashlib.blake2b(document.encode(), digest_size=16).hexdigest()
+        new_metadata_hash = hashlib.blake2b(
+            json.dumps(metadata, sort_keys=True).encode(), digest_size=16
+        ).hexdigest()
+
+        if (new_hash, new_metadata_hash) == (self.content_hash, self.metadata_hash):
+            return
+
+        collection = get_unified_collection()
+        try:
+            if new_hash == self.content_hash:
+                # only metadata changed, no need to compute the embedding again
+                collection.update(ids=[self.id_str], metadatas=[metadata])
+            else:
+                collection.upsert(
+                    ids=[self.id_str], documents=[document], metadatas=[metadata]
+                )
+        except Exception as e:
+            logger.exception(e)
             return
 
-        # Update ChromaDB unified collection
-        if self.title or self.text:
-            collection = get_unified_collection()
-
-            collection.upsert(
-                ids=[self.build_id()],
-                documents=[self.title + " " + self.text],
-                metadatas=[
-                    {
-                        "source_type": self.type,
-                        "page_id": self.page_id,
-                        "title": self.title,
-                        "date": self.date,
-                        "group_name": self.group_name,
-                    },
-                ],
-            )
+        self.content_hash = new_hash
+        self.metadata_hash = new_metadata_hash
 
     def delete(self) -> None:
         # Remove from ChromaDB unified collection
         collection = get_unified_collection()
-        collection.delete(ids=[self.build_id()])
+        collection.delete(ids=[self.id_str])
 
         super().delete()
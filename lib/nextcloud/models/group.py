@@ -1,12 +1,12 @@
-import re
+import threading
+import time
 from functools import cached_property
-from typing import ClassVar, List, cast
+from typing import ClassVar, Dict, List, Sequence, cast
 
 from lib.nextcloud.config import bot_config
 from lib.nextcloud.models.collective_page import CollectivePage
-from lib.settings import user_regex
 
-from .base import CouchDBModel
+from .base import CouchDBModel, scan_lines
 
 
 class Group(CouchDBModel):
@@ -20,8 +20,15 @@ class Group(CouchDBModel):
     members: List[str] = []
     short_names: List[str] = []
 
-    # Class-level cache shared across all instances
+    # Class-level cache shared across all instances, refreshed after the TTL
+    CACHE_TTL_SECONDS: ClassVar[int] = 300
     _cached_groups: ClassVar[List["Group"] | None] = None
+    _cached_at: ClassVar[float] = 0.0
+    _groups_lock: ClassVar[threading.Lock] = threading.Lock()
+    # lookup indexes into the cache, keyed by id / lowercased name / short name
+    _groups_by_id: ClassVar[Dict[str, "Group"]] = {}
+    _groups_by_name: ClassVar[Dict[str, "Group"]] = {}
+    _groups_by_short_name: ClassVar[Dict[str, "Group"]] = {}
 
     def build_id(self) -> str:
         return f"{self.__class__.__name__}:{self.page_id}"
@@ -51,9 +58,59 @@ class Group(CouchDBModel):
 
     @classmethod
     def get(cls, doc_id: str) -> "Group":
-        """Get a Group by its id."""
+        """Get a Group by its id, served from the group cache if it is loaded."""
+        if time.monotonic() - Group._cached_at <= Group.CACHE_TTL_SECONDS:
+            group = Group._groups_by_id.get(doc_id)
+            if group is not None:
+                return group
         return cast(Group, super().get(doc_id))
 
+    @classmethod
+    def _load_cache(cls) -> None:
+        """Load all groups and build the name lookup indexes."""
+        groups = list(Group.iter_all(sort=[{"updated_at": "desc"}]))
+
+        Group._groups_by_id = {g.id: g for g in groups if g.id}
+        # iterate in reverse so the first group in the list wins on duplicates
+        Group._groups_by_name = {g.name.lower(): g for g in reversed(groups)}
+        Group._groups_by_short_name = {
+            sn.lower(): g for g in reversed(groups) for sn in g.short_names
+        }
+        Group._cached_groups = groups
+        Group._cached_at = time.monotonic()
+
+    @classmethod
+    def _ensure_cache(cls) -> tuple[Dict[str, "Group"], Dict[str, "Group"]]:
+        """
+        Load the group cache if it is empty or older than the TTL.
+        Returns the name and short name indexes.
+        """
+        with Group._groups_lock:
+            if (
+                Group._cached_groups is None
+                or time.monotonic() - Group._cached_at > Group.CACHE_TTL_SECONDS
+            ):
+                cls._load_cache()
+            return Group._groups_by_name, Group._groups_by_short_name
+
+    @classmethod
+    def warm_cache(cls) -> threading.Thread:
+        """Load the group cache in a background thread."""
+        thread = threading.Thread(
+            target=cls._ensure_cache, name="group-cache-warmup", daemon=True
+        )
+        thread.start()
+        return thread
+
+    @classmethod
+    def invalidate_cache(cls) -> None:
+        """Drop the group cache, the next lookup will reload all groups."""
+        with Group._groups_lock:
+            Group._cached_groups = None
+            Group._groups_by_id = {}
+            Group._groups_by_name = {}
+            Group._groups_by_short_name = {}
+
     @classmethod
     def get_by_name(cls, name: str) -> "Group":
         """
@@ -61,22 +118,37 @@ class Group(CouchDBModel):
         If no exact match is found, try to lookup by short names.
         """
 
-        if Group._cached_groups is None:
-            Group._cached_groups = cast(List[Group], Group.get_all(limit=1000))
-
-        docs = [g for g in Group._cached_groups if g.name.lower() == name.lower()]
+        by_name, by_short_name = cls._ensure_cache()
 
-        if not docs:
+        name_lower = name.lower()
+        group = by_name.get(name_lower)
+        if group is None:
             # try short names
-            docs = [
-                g
-                for g in Group._cached_groups
-                if name.lower() in {sn.lower() for sn in g.short_names}
-            ]
+            group = by_short_name.get(name_lower)
 
-        if not docs:
+        if group is None:
             raise ValueError(f"Group with name '{name}' not found")
-        return docs[0]
+        return group
+
+    def save(self, skip_set_updated_at: bool = False) -> None:
+        super().save(skip_set_updated_at=skip_set_updated_at)
+        Group.invalidate_cache()
+
+    @classmethod
+    def save_many(
+        cls,
+        instances: Sequence["CouchDBModel"],
+        skip_set_updated_at: bool = False,
+        batch_size: int = 200,
+    ) -> None:
+        super().save_many(
+            instances, skip_set_updated_at=skip_set_updated_at, batch_size=batch_size
+        )
+        Group.invalidate_cache()
+
+    def delete(self) -> None:
+        super().delete()
+        Group.invalidate_cache()
 
     @classmethod
     def valid_name(cls, name: str) -> bool:
@@ -104,7 +176,11 @@ class Group(CouchDBModel):
             raise ValueError("Cannot determine group name from page")
         return cls.get_by_name(group_names[0])
 
-    def update_from_page(self) -> None:
+    def update_from_page(self, save: bool = True) -> None:
+        """
+        Update the group from its page. With save=False the caller is
+        responsible for saving, e.g. several groups at once with save_many.
+        """
         page = CollectivePage.get_from_page_id(self.page_id)
         if not page or not page.content:
             raise ValueError("Cannot update Group: page content is missing")
@@ -119,50 +195,46 @@ class Group(CouchDBModel):
         self.emoji = page.ocs.emoji or ""
 
         # parse content now
-        lines = page.content.splitlines()
-        first_word_regex = re.compile(r"\b(\w[\w-]*)\b")
-
-        self.coordination = []
-        self.delegate = []
-        self.members = []
-        attr = ""
-
-        for line in lines:
-            # get the first word on the line, ignoring any leading non-word chars
-            m = first_word_regex.search(line)
-            if not m:
-                continue
-            first_word = m.group(1).lower()
-
-            if first_word in bot_config.organisation.coordination_person_keywords:
-                attr = "coordination"
-            elif first_word in bot_config.organisation.delegate_person_keywords:
-                attr = "delegate"
-            elif first_word in bot_config.organisation.member_person_keywords:
-                attr = "members"
-            elif first_word in bot_config.organisation.group_shortname_keywords:
+        content = page.content
+
+        dispatch = bot_config.organisation.group_keyword_dispatch.get
+
+        coordination: List[str] = []
+        delegate: List[str] = []
+        members: List[str] = []
+        short_names: set[str] = set()
+        buckets = {
+            "coordination": coordination,
+            "delegate": delegate,
+            "members": members,
+        }
+        bucket: List[str] | None = None
+
+        for first_word, users, line_start in scan_lines(content):
+            field = dispatch(first_word)
+            if field == "short_names":
+                line_end = content.find("\n", line_start)
+                line = content[line_start : line_end if line_end != -1 else None]
                 # shortnames are split by commas
-                shortnames = line.split(":")[-1].strip("*").strip().split(",")
-                shortnames = [
-                    sn.strip().lower() for sn in shortnames if sn.strip() != ""
-                ]
-                self.short_names.extend(sorted(shortnames))
+                for sn in line.split(":")[-1].strip("*").strip().split(","):
+                    sn = sn.strip()
+                    if sn:
+                        short_names.add(sn.lower())
                 continue
-
-            users = re.findall(user_regex, line)
-            if users and attr:
-                users_list = getattr(self, attr)
-                users_list.extend(users)
-                setattr(self, attr, sorted(users_list))
-            elif line.strip() != "" and first_word not in (
-                bot_config.organisation.coordination_person_keywords
-                + bot_config.organisation.delegate_person_keywords
-                + bot_config.organisation.member_person_keywords
-            ):
-                attr = ""
-
-        self.members = sorted(
-            set(self.members) - set(self.coordination) - set(self.delegate)
-        )
-
-        self.save()
+            if field is not None:
+                bucket = buckets[field]
+
+            if users and bucket is not None:
+                bucket.extend(users)
+            elif field is None:
+                bucket = None
+
+        coordination_set = set(coordination)
+        delegate_set = set(delegate)
+        self.coordination = sorted(coordination_set)
+        self.delegate = sorted(delegate_set)
+        self.members = sorted(set(members) - coordination_set - delegate_set)
+        self.short_names = sorted(short_names)
+
+        if save:
+            self.save()
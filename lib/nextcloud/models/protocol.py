@@ -1,25 +1,96 @@
 import logging
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date as dateType
 from datetime import datetime
-from functools import cached_property
-from typing import List
-
-from google import genai
+from functools import cache, cached_property, lru_cache
+from typing import Any, Dict, List, Tuple, cast
 
 from lib.nextcloud.config import bot_config
 from lib.nextcloud.models.decision import Decision
 from lib.nextcloud.models.group import Group
 from lib.nextcloud.models.user import NCUserList
 from lib.outbound.rocketchat import send_message
-from lib.settings import _, settings, user_regex
+from lib.settings import _, settings
 
-from .base import CouchDBModel
+from .base import CouchDBModel, scan_lines
 from .collective_page import CollectivePage
 
 logger = logging.getLogger(__name__)
 
+# decisions are marked as ::: success blocks
+DECISION_BLOCK_START = "::: success"
+DECISION_BLOCK_END = ":::"
+
+# protocol dates are written as YYYY-MM-DD
+iso_date_regex = re.compile(r"\d{4}-\d{2}-\d{2}", re.ASCII)
+
+# protocol titles start with the date, followed by a space
+title_date_regex = re.compile(r"(\d{4}-\d{2}-\d{2}) ", re.ASCII)
+
+# end of the protocol header: a heading or a horizontal rule line
+header_end_regex = re.compile(r"^[^\S\n]*(?:#|---[^\S\n]*$)", re.MULTILINE)
+
+
+def find_decision_blocks(content: str) -> List[str]:
+    """
+    Return the contents of all ::: success blocks.
+    Uses plain substring searches, so the scan stays linear in the content size.
+    """
+    blocks: List[str] = []
+    pos = 0
+    while True:
+        start = content.find(DECISION_BLOCK_START, pos)
+        if start == -1:
+            break
+        start += len(DECISION_BLOCK_START)
+        end = content.find(DECISION_BLOCK_END, start)
+        if end == -1:
+            break
+        blocks.append(content[start:end])
+        pos = end + len(DECISION_BLOCK_END)
+    return blocks
+
+
+@lru_cache(maxsize=32)
+def keyword_prefix_pattern(keywords: Tuple[str, ...]) -> re.Pattern | None:
+    """
+    Compile a single line prefix pattern matching any of the keywords.
+    Longer keywords come first, so they are not shadowed by their prefixes.
+    Returns None without keywords, an empty pattern would match every line.
+    """
+    if not keywords:
+        return None
+    alternatives = "|".join(
+        re.escape(kw) for kw in sorted(keywords, key=len, reverse=True)
+    )
+    return re.compile(rf"^(?:{alternatives})[:\s\-]*", re.IGNORECASE)
+
+
+def parse_date(date_str: str) -> dateType:
+    """
+    Parse a date in the strict YYYY-MM-DD format.
+    Raises ValueError for other formats accepted by date.fromisoformat.
+    """
+    if not iso_date_regex.fullmatch(date_str):
+        raise ValueError(f"Invalid date: {date_str!r}")
+    return dateType.fromisoformat(date_str)
+
+
+@cache
+def _genai_client(api_key: str):
+    """Return a Gemini client per API key, reusing its HTTP connections."""
+    # imported lazily, the SDK is only needed when summaries are enabled
+    from google import genai
+
+    return genai.Client(api_key=api_key)
+
+
+def clean_line(line: str) -> str:
+    """Remove bold markers and surrounding backslashes and line breaks."""
+    return line.replace("**", "").replace("__", "").strip("\\\n\r")
+
 
 class Protocol(CouchDBModel):
     group_id: str | None = None
@@ -36,6 +107,13 @@ class Protocol(CouchDBModel):
     def build_id(self) -> str:
         return f"{self.__class__.__name__}:{self.page_id}"
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        # drop the cached lookups depending on the changed field
+        cached = {"group_id": "group", "page_id": "page", "date": "date_obj"}.get(name)
+        if cached:
+            self.__dict__.pop(cached, None)
+
     def __str__(self) -> str:
         if self.page:
             return f"{self.page.title}"
@@ -60,7 +138,7 @@ class Protocol(CouchDBModel):
     @cached_property
     def date_obj(self) -> dateType | None:
         if self.date:
-            return datetime.strptime(self.date.split()[0], "%Y-%m-%d").date()
+            return parse_date(self.date.split()[0])
         return None
 
     @property
@@ -79,12 +157,12 @@ class Protocol(CouchDBModel):
     def valid_date(cls, title: str) -> bool:
         """Check if the given title is a valid protocol title."""
         # Simple check: title starts with a date in YYYY-MM-DD format
-        if " " not in title:
+        m = title_date_regex.match(title)
+        if not m:
             return False
-        date_str, _group_name = title.split(" ", 1)
-        # parse date_str and check if valid date
+        # check that it is a valid calendar date
         try:
-            datetime.strptime(date_str, "%Y-%m-%d")
+            dateType.fromisoformat(m.group(1))
         except ValueError:
             return False
         return True
@@ -117,78 +195,88 @@ class Protocol(CouchDBModel):
 
     @classmethod
     def is_protocol_page(cls, page: "CollectivePage") -> bool:
-        protocol_kws = set(bot_config.organisation.protocol_subtype_keywords)
+        protocol_kws = bot_config.organisation.protocol_subtype_keyword_set
+
+        path = page.ocs.filePath
+        last_slash = path.rfind("/")
+        if page.is_readme:
+            # readme pages are protocols if their parent folder is a protocol one
+            if last_slash == -1:
+                return False
+            segment = path[path.rfind("/", 0, last_slash) + 1 : last_slash]
+        else:
+            segment = path[last_slash + 1 :]
 
-        return (
-            len(page.ocs.filePath.split("/")) > 1
-            and (
-                page.is_readme
-                and page.ocs.filePath.split("/")[-2].lower() in protocol_kws
-            )
-            or (
-                not page.is_readme
-                and page.ocs.filePath.split("/")[-1].lower() in protocol_kws
-            )
-        )
+        return segment.lower() in protocol_kws
 
-    def extract_decisions(self) -> List[Decision]:
+    def extract_decisions(self, today: dateType | None = None) -> List[Decision]:
         """Get all decisions marked with ::: success"""
         if not self.page or not self.page.content:
             return []
 
-        if (
-            self.valid_date(self.page.title)
-            and self.date_obj
-            and self.date_obj > datetime.now().date()
-        ):
+        if today is None:
+            today = datetime.now().date()
+
+        if self.valid_date(self.page.title) and self.date_obj and self.date_obj > today:
             logger.info(
                 "Skipping decision extraction for future protocol %s", self.build_id()
             )
             return []
 
-        # delete existing decision for this page
-        for d in Decision.get_all(selector={"page_id": self.page_id}):
-            d.delete()
+        # decisions already stored for this page, re-parsed decisions take
+        # over their hashes so unchanged ones are not embedded again
+        stored: Dict[str, Decision] = {
+            cast(str, d.id): d
+            for d in Decision.iter_all(selector={"page_id": self.page_id})
+        }
 
-        # Simple regex to find ::: success blocks
-        decision_blocks = re.findall(
-            r"::: success(.*?):::", self.page.content, re.DOTALL
-        )
+        decision_blocks = find_decision_blocks(self.page.content)
 
         decisions: List[Decision] = []
         for block in decision_blocks:
-            decision: Decision | None = self.save_decision(block)
+            decision: Decision | None = self.save_decision(block, stored)
             if decision is not None:
                 decisions.append(decision)
-        return decisions
-
-    def save_decision(self, block: str) -> Decision | None:
-        """Parse and save on decision from a markdown block."""
 
-        def clean_line(line: str) -> str:
-            return (
-                line.replace("**", "")
-                .replace("__", "")
-                .strip("\\")
-                .strip("\n")
-                .strip("\r")
+        # delete the decisions that were removed from the protocol
+        parsed_ids = {d.id_str for d in decisions}
+        removed_ids = [doc_id for doc_id in stored if doc_id not in parsed_ids]
+        if removed_ids:
+            Decision.bulk_delete(
+                selector={"page_id": self.page_id, "_id": {"$in": removed_ids}}
             )
+        return decisions
+
+    def save_decision(
+        self, block: str, stored: Dict[str, Decision] | None = None
+    ) -> Decision | None:
+        """
+        Parse and save on decision from a markdown block.
+        `stored` are the decisions of this page already in CouchDB by id.
+        """
 
         lines = block.strip().splitlines()
         if not lines:
             return None
 
+        organisation = bot_config.organisation
+        title_pattern = keyword_prefix_pattern(
+            tuple(organisation.decision_title_keywords)
+        )
+        valid_until_pattern = keyword_prefix_pattern(
+            tuple(organisation.decision_valid_until_keywords)
+        )
+        objection_pattern = keyword_prefix_pattern(
+            tuple(organisation.decision_objection_keywords)
+        )
+
         title = clean_line(lines[0])
-        for title_kw in bot_config.organisation.decision_title_keywords:
-            title = clean_line(
-                re.sub(rf"^{title_kw}[:\s\-]*", "", title, flags=re.IGNORECASE)
-                .strip(":")
-                .strip()
-            )
+        if title_pattern:
+            title = clean_line(title_pattern.sub("", title).strip(":").strip())
         # remove first line
         lines = lines[1:]
 
-        if bot_config.organisation.protocol_decision_example_title in title:
+        if organisation.protocol_decision_example_title in title:
             return None  # skip example decisions
 
         decision = Decision(
@@ -203,27 +291,19 @@ class Protocol(CouchDBModel):
         for i, line in enumerate(lines):
             line = clean_line(line)
 
-            for valid_until_kw in bot_config.organisation.decision_valid_until_keywords:
-                if re.match(rf"^{valid_until_kw}[:\s\-]*", line, flags=re.IGNORECASE):
-                    decision.valid_until = clean_line(
-                        re.sub(
-                            rf"^{valid_until_kw}[:\s\-]*", "", line, flags=re.IGNORECASE
-                        )
+            m = valid_until_pattern.match(line) if valid_until_pattern else None
+            if m:
+                decision.valid_until = clean_line(line[m.end() :])
+                line = ""  # remove line after processing
+
+            m = objection_pattern.match(line) if objection_pattern else None
+            if m:
+                decision.objections = clean_line(line[m.end() :])
+                if len(lines) > i + 1:
+                    # add all following lines as objections too
+                    decision.objections += "\n".join(
+                        [clean_line(last_lines) for last_lines in lines[i + 1 :]]
                     )
-                    line = ""  # remove line after processing
-
-            for objection_kw in bot_config.organisation.decision_objection_keywords:
-                if re.match(rf"^{objection_kw}[:\s\-]*", line, flags=re.IGNORECASE):
-                    decision.objections = clean_line(
-                        re.sub(
-                            rf"^{objection_kw}[:\s\-]*", "", line, flags=re.IGNORECASE
-                        )
-                    )
-                    if len(lines) > i + 1:
-                        # add all following lines as objections too
-                        decision.objections += "\n".join(
-                            [clean_line(last_lines) for last_lines in lines[i + 1 :]]
-                        )
 
             if decision.objections:
                 break  # stop processing lines after objections were set
@@ -235,6 +315,14 @@ class Protocol(CouchDBModel):
             decision.title = decision.text
             decision.text = ""
 
+        previous = None
+        if stored and (decision.title or decision.text):
+            previous = stored.get(decision.id_str)
+        if previous is not None:
+            decision.rev = previous.rev
+            decision.content_hash = previous.content_hash
+            decision.metadata_hash = previous.metadata_hash
+
         decision.save()
         return decision
 
@@ -247,6 +335,7 @@ class Protocol(CouchDBModel):
         )
         if not username:
             logger.warning("Cannot notify updated: no username found for protocol")
+            return
 
         corrections = []
         if not self.moderated_by:
@@ -274,7 +363,7 @@ class Protocol(CouchDBModel):
                 )
             )
 
-        user = NCUserList().get_user_by_uid(username or "")
+        user = NCUserList().get_user_by_uid(username)
         displayname = user.ocs.displayname if user else username
 
         if corrections:
@@ -299,30 +388,27 @@ class Protocol(CouchDBModel):
                 url=(self.page.url if self.page else ""),
             )
 
-        message += "\n---\n\n"
-        message += _("Date: ") + self.date + "\n"
+        parts = [message, "\n---\n\n", _("Date: "), self.date, "\n"]
         if self.page and self.page.ocs and self.page.ocs.lastUserId:
-            message += _("Last update by: ") + self.page.ocs.lastUserId + "\n"
-        message += _("Moderated by: ") + ", ".join(self.moderated_by) + "\n"
-        message += _("Protocol by: ") + ", ".join(self.protocol_by) + "\n"
-        message += _("Participants: ") + ", ".join(self.participants) + "\n"
+            parts += [_("Last update by: "), self.page.ocs.lastUserId, "\n"]
+        parts += [_("Moderated by: "), ", ".join(self.moderated_by), "\n"]
+        parts += [_("Protocol by: "), ", ".join(self.protocol_by), "\n"]
+        parts += [_("Participants: "), ", ".join(self.participants), "\n"]
         if decisions:
-            message += _("Decisions made:\n")
+            parts.append(_("Decisions made:\n"))
             for decision in decisions:
-                message += f"- ✅ **{decision.title}**"
+                parts.append(f"- ✅ **{decision.title}**")
                 if decision.text:
-                    message += "\r  " + decision.text
+                    parts += ["\r  ", decision.text]
                 if decision.objections:
-                    message += "\r  **" + _("Objections") + "**: " + decision.objections
+                    parts += ["\r  **", _("Objections"), "**: ", decision.objections]
                 if decision.valid_until:
-                    message += (
-                        "\r  **" + _("Valid until") + "**: " + decision.valid_until
-                    )
-                message += "\n"
+                    parts += ["\r  **", _("Valid until"), "**: ", decision.valid_until]
+                parts.append("\n")
         if self.ai_summary:
-            message += _("AI Summary:") + "\n" + self.ai_summary + "\n\n"
+            parts += [_("AI Summary:"), "\n", self.ai_summary, "\n\n"]
 
-        send_message(text=message, channel=f"@{username}")
+        send_message(text="".join(parts), channel=f"@{username}")
 
         if not corrections:
             text = _("Please manually a post in the channel #{protocols}").format(
@@ -374,7 +460,7 @@ class Protocol(CouchDBModel):
                     date=self.date, content=self.page.content
                 )
 
-                client = genai.Client(api_key=settings.gemini_api_key)
+                client = _genai_client(settings.gemini_api_key)
                 response = client.models.generate_content(
                     model=settings.gemini_model,
                     contents=prompt,
@@ -394,6 +480,22 @@ class Protocol(CouchDBModel):
             elif not self.page or not self.page.content:
                 logger.info("Skipping AI summary: no page content available")
 
+    @classmethod
+    def generate_ai_summaries(
+        cls, protocols: List["Protocol"], max_workers: int = 8
+    ) -> None:
+        """
+        Generate the AI summaries of several protocols concurrently.
+        The requests share one Gemini client, so they run over the same connection pool.
+        """
+        if len(protocols) <= 1:
+            for protocol in protocols:
+                protocol.generate_ai_summary()
+            return
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(protocols))) as pool:
+            list(pool.map(cls.generate_ai_summary, protocols))
+
     def update_from_page(self) -> None:
         """
         Update the Protocol fields from the associated CollectivePage content.
@@ -444,53 +546,45 @@ class Protocol(CouchDBModel):
             except ValueError:
                 pass
 
-        lines = page.content.splitlines()
-        first_word_regex = re.compile(r"\b(\w[\w-]*)\b")
-
-        self.moderated_by = []
-        self.protocol_by = []
-        self.participants = []
-        attr = ""
-
-        for line in lines:
-            if line.strip() == "---" or line.strip().startswith("#"):
-                break  # stop at horizontal rule
-
-            # get the first word on the line, ignoring any leading non-word chars
-            m = first_word_regex.search(line)
-            if not m:
-                continue
-            first_word = m.group(1).lower()
-
-            if first_word in bot_config.organisation.moderation_person_keywords:
-                attr = "moderated_by"
-            elif first_word in bot_config.organisation.protocol_person_keywords:
-                attr = "protocol_by"
-            elif first_word in bot_config.organisation.participant_person_keywords:
-                attr = "participants"
-
-            users = re.findall(user_regex, line)
-            if users and attr:
-                users_list = getattr(self, attr)
-                users_list.extend(users)
-                setattr(self, attr, sorted(users_list))
-            elif line.strip() != "" and first_word not in (
-                bot_config.organisation.moderation_person_keywords
-                + bot_config.organisation.protocol_person_keywords
-                + bot_config.organisation.participant_person_keywords
-            ):
-                attr = ""
-
-        self.participants = sorted(
-            set(self.participants) - set(self.moderated_by) - set(self.protocol_by)
-        )
+        # only the part before the first heading or horizontal rule is parsed
+        content = page.content
+        m = header_end_regex.search(content)
+        if m:
+            content = content[: m.start()]
+
+        dispatch = bot_config.organisation.protocol_keyword_dispatch.get
+
+        moderated_by: set[str] = set()
+        protocol_by: set[str] = set()
+        participants: set[str] = set()
+        buckets = {
+            "moderated_by": moderated_by,
+            "protocol_by": protocol_by,
+            "participants": participants,
+        }
+        bucket: set[str] | None = None
+
+        for first_word, users, _line_start in scan_lines(content):
+            field = dispatch(first_word)
+            if field is not None:
+                bucket = buckets[field]
+
+            if users and bucket is not None:
+                bucket.update(users)
+            elif field is None:
+                bucket = None
+
+        self.moderated_by = sorted(moderated_by)
+        self.protocol_by = sorted(protocol_by)
+        self.participants = sorted(participants - moderated_by - protocol_by)
+        today = datetime.now().date()
         try:
-            decisions = self.extract_decisions()
+            decisions = self.extract_decisions(today=today)
             self.generate_ai_summary()
 
             # Only notify if protocol is recent
             if self.date_obj:
-                days_old = (datetime.now().date() - self.date_obj).days
+                days_old = (today - self.date_obj).days
                 if (
                     days_old >= 0
                     and days_old <= bot_config.organisation.protocol_max_age_days
@@ -512,10 +606,8 @@ class Protocol(CouchDBModel):
         """Delete the protocol and all related Decisions."""
         # Delete all decisions related to this protocol's page
         if self.page_id:
-            decisions = Decision.get_all(selector={"page_id": self.page_id}, limit=1000)
-            for decision in decisions:
-                logger.info("  Deleting decision from protocol: %s", decision.title)
-                decision.delete()  # Decision.delete() also removes from ChromaDB
+            # Decision.bulk_delete() also removes them from ChromaDB
+            Decision.bulk_delete(selector={"page_id": self.page_id})
 
         # Delete the protocol itself
         super().delete()
@@ -1,11 +1,11 @@
 import logging
+from collections import defaultdict
 from functools import cached_property
-from typing import Dict, List, Set
+from typing import Dict, List, Set, cast
 
 import requests
 from pydantic import BaseModel, Field, field_validator
 
-from lib.couchdb import couchdb
 from lib.nextcloud.models.base import CouchDBModel
 from lib.nextcloud.models.group import Group
 from lib.settings import settings
@@ -69,10 +69,30 @@ class NCUser(CouchDBModel):
     # Primary identifiers
     username: str = ""
 
+    @classmethod
+    def from_doc(cls, doc: dict) -> "NCUser":
+        """
+        Build a user from a stored document. Only the nested OCSUser, which
+        holds nearly all fields, is validated, e.g. to map its aliases.
+        """
+        return cls.model_construct(
+            **{
+                **doc,
+                "id": doc.get("_id", doc.get("id")),
+                "rev": doc.get("_rev", doc.get("rev")),
+                "ocs": OCSUser.model_validate(doc.get("ocs") or {}),
+            }
+        )
+
     def build_id(self) -> str:
         return f"{type(self).__name__}:{self.username}"
 
     def __str__(self) -> str:
+        return self.short_name
+
+    @cached_property
+    def short_name(self) -> str:
+        """First name and initial of the last name, used as label in the pages."""
         name_parts = self.ocs.displayname.split() if self.ocs.displayname else []
         return (
             f"{name_parts[0]} {name_parts[1][0]}."
@@ -91,41 +111,60 @@ class NCUserList:
 
     USER_LIST_URL = "/ocs/v2.php/cloud/users/details"
 
+    # HTTP session shared by all instances, keeps the connection to Nextcloud open
+    _session = requests.Session()
+
     # Class-level cache shared across all instances
     _cached_users: Dict[str, NCUser] | None = None
+    _cached_users_by_group: Dict[str, List[NCUser]] = {}
 
-    users: Dict[str, NCUser]
+    _users: Dict[str, NCUser] | None = None
+    _users_by_group: Dict[str, List[NCUser]] = {}
 
     def __init__(self):
-        # Use cached users if available, otherwise load from database
-        if NCUserList._cached_users is not None:
-            self.users = NCUserList._cached_users
-        else:
-            self.load_users()
+        # Use cached users if available, otherwise they are loaded on first access
+        self._users = NCUserList._cached_users
+        self._users_by_group = NCUserList._cached_users_by_group
 
     def __getitem__(self, username: str) -> NCUser:
         return self.users[username]
 
-    def load_users(self):
-        db = couchdb()
+    @property
+    def users(self) -> Dict[str, NCUser]:
+        if self._users is None:
+            self.load_users()
+        return cast(Dict[str, NCUser], self._users)
 
-        lookup = {
-            "selector": {"type": NCUser.__name__},
-            "limit": 1000,
-        }
-        response, results = db.resource.post("_find", json=lookup)
-        response.raise_for_status()
+    @property
+    def users_by_group(self) -> Dict[str, List[NCUser]]:
+        """Users per Nextcloud group name."""
+        if self._users is None:
+            self.load_users()
+        return self._users_by_group
 
-        self.users = {d["username"]: NCUser(**d) for d in results.get("docs", [])}
+    def load_users(self):
+        # paginated, so the user list is not truncated at a fixed limit
+        self._set_users({u.username: u for u in NCUser.iter_all(batch_size=500)})
+
+    def _set_users(self, users: Dict[str, NCUser]) -> None:
+        """Set the users, index them by group and update the class-level cache."""
+        users_by_group: Dict[str, List[NCUser]] = defaultdict(list)
+        for user in users.values():
+            for group_name in user.ocs.groups:
+                users_by_group[group_name].append(user)
+
+        self._users = users
+        self._users_by_group = users_by_group
         # Update the class-level cache
-        NCUserList._cached_users = self.users
+        NCUserList._cached_users = users
+        NCUserList._cached_users_by_group = users_by_group
 
     def get_user_by_uid(self, uid: str) -> NCUser | None:
         """Get a user by their uid."""
         return self.users.get(uid, None)
 
     def update_from_nextcloud(self):
-        response = requests.get(
+        response = self._session.get(
             f"{settings.nextcloud.base_url}{self.USER_LIST_URL}",
             auth=(settings.nextcloud.admin_username, settings.nextcloud.admin_password),
             headers={"OCS-APIRequest": "true", "Accept": "application/json"},
@@ -144,28 +183,29 @@ class NCUserList:
         current_usernames = {u.username for u in self.get_enabled_users()}
 
         # Save/update users from Nextcloud
+        users: List[NCUser] = []
         for username, user_data in nextcloud_users.items():
             if "id" in user_data:
                 user_data["nextcloud_id"] = user_data.pop("id")
             ocs_user = OCSUser(**user_data)
-            user = NCUser(username=username, ocs=ocs_user)
-            user.build_id()
-            user.save()
-            logger.debug("Saved user %s to CouchDB", username)
+            users.append(NCUser(username=username, ocs=ocs_user))
 
         # Mark users that no longer exist in Nextcloud as disabled
         users_to_disable = current_usernames - nextcloud_usernames
         for username in users_to_disable:
             user = self.users[username]
             user.ocs.enabled = False
-            user.save()
+            users.append(user)
             logger.info(
-                "Marked user %s as disabled in CouchDB (no longer exists in Nextcloud)",
+                "Marking user %s as disabled in CouchDB (no longer exists in Nextcloud)",
                 username,
             )
 
-        # Refresh cache after updating from Nextcloud
-        self.load_users()
+        NCUser.save_many(users)
+        logger.debug("Saved %d users to CouchDB", len(users))
+
+        # Refresh cache with the saved users instead of loading them again
+        self._set_users(self.users | {u.username: u for u in users})
 
     def mails_for_groups(self, group_names: List[str]) -> Set[str]:
         """
@@ -185,9 +225,7 @@ class NCUserList:
             except ValueError:
                 pass
 
-            user_emails |= {
-                u.ocs.email for u in self.users.values() if name in u.ocs.groups
-            }
+            user_emails.update(u.ocs.email for u in self.users_by_group.get(name, ()))
 
         return user_emails
 
@@ -1,5 +1,8 @@
+import atexit
 import json
 import logging
+import queue
+import threading
 
 import requests
 
@@ -7,36 +10,79 @@ from lib.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# shared session, keeps the connection to the webhook open between messages
+_session = requests.Session()
+
+# Messages are posted by a background worker in the order they were sent, so
+# callers do not wait for the webhook.
+_message_queue: "queue.Queue[dict]" = queue.Queue()
+_message_worker: threading.Thread | None = None
+_message_worker_lock = threading.Lock()
+
+
+def _post_message(payload: dict) -> None:
+    """Post a single message payload to the webhook."""
+    response = _session.post(str(settings.rocketchat.hook_url), json=payload)
+    # response.raise_for_status()
+
+    # log error if request failed
+    if response.status_code != 200:
+        logger.error(
+            "Failed to send notification to channel %s: %s",
+            payload["channel"],
+            response.text,
+        )
+    elif logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Sent notification to channel %s: %s",
+            payload["channel"],
+            json.dumps(payload),
+        )
+
+
+def _run_message_worker() -> None:
+    while True:
+        payload = _message_queue.get()
+        try:
+            _post_message(payload)
+        except Exception as e:
+            logger.exception(e)
+        finally:
+            _message_queue.task_done()
+
+
+def flush() -> None:
+    """Block until all queued messages have been posted."""
+    _message_queue.join()
+
+
+atexit.register(flush)
+
 
 def send_message(text: str, channel: str, emoji: str = ":robot:") -> None:
     """Send a message to Rocket.Chat via incoming webhook."""
+    global _message_worker
 
-    webhook_url = settings.rocketchat.hook_url
+    rocketchat_settings = settings.rocketchat
+    webhook_url = rocketchat_settings.hook_url
 
-    if settings.rocketchat.channel_overwrite:
+    if rocketchat_settings.channel_overwrite:
         # for debugging porposes, override the channel
-        channel = settings.rocketchat.channel_overwrite
+        channel = rocketchat_settings.channel_overwrite
 
     payload = {"text": text, "channel": channel, "emoji": emoji}
 
-    logger.info(f"Message sent to {channel}: {text}")
+    logger.info("Message sent to %s: %s", channel, text)
 
     if webhook_url:
-        response = requests.post(str(webhook_url), json=payload)
-        # response.raise_for_status()
-
-        # log error if request failed
-        if response.status_code != 200:
-            logger.error(
-                "Failed to send notification to channel %s: %s",
-                channel,
-                response.text,
-            )
-        else:
-            logger.debug(
-                "Sent notification to channel %s: %s", channel, json.dumps(payload)
-            )
-    else:
+        with _message_worker_lock:
+            if _message_worker is None or not _message_worker.is_alive():
+                _message_worker = threading.Thread(
+                    target=_run_message_worker, name="rocketchat-worker", daemon=True
+                )
+                _message_worker.start()
+        _message_queue.put(payload)
+    elif logger.isEnabledFor(logging.WARNING):
         logger.warning(
             "Chat URL not configured, this is the message: %s", json.dumps(payload)
         )
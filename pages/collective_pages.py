@@ -1,5 +1,6 @@
 from typing import List
 
+import pandas as pd
 import streamlit as st
 
 from lib.menu import menu
@@ -18,32 +19,47 @@ menu()
 st.title(title)
 
 
-# load collective pages
-def load_collective_pages() -> List[CollectivePage]:
-    return CollectivePage.get_all(limit=1000, sort=[{"ocs.timestamp": "desc"}])
+# load collective pages and build one table row per page in a single pass
+@st.cache_data(ttl=300)
+def load_page_rows() -> List[tuple]:
+    rows = []
+    for p in CollectivePage.get_all(limit=1000, sort=[{"ocs.timestamp": "desc"}]):
+        ocs = p.ocs
+        rows.append(
+            (
+                p.id,
+                p.title,
+                ocs.filePath if ocs else "",
+                p.subtype,
+                p.is_readme,
+                p.url or "",
+                p.formatted_timestamp or "",
+            )
+        )
+    return rows
 
 
-pages = load_collective_pages()
+rows = load_page_rows()
 
 # Search by filePath
 search_fp = st.text_input(_("Search filePath"), placeholder="/group/subgroup/readme.md")
 if search_fp:
-    pages = [
-        p
-        for p in pages
-        if p.ocs and search_fp.lower() in (p.ocs.filePath or "").lower()
-    ]
+    search = search_fp.lower()
+    rows = [row for row in rows if search in (row[2] or "").lower()]
 
 # Build dataframe
-df = {
-    _("ID"): [p.id for p in pages],
-    _("Title"): [p.title for p in pages],
-    _("filePath"): [p.ocs.filePath if p.ocs else "" for p in pages],
-    _("subtype"): [p.subtype for p in pages],
-    _("is_readme"): [p.is_readme for p in pages],
-    _("URL"): [p.url or "" for p in pages],
-    _("Timestamp"): [p.formatted_timestamp or "" for p in pages],
-}
+df = pd.DataFrame.from_records(
+    rows,
+    columns=[
+        _("ID"),
+        _("Title"),
+        _("filePath"),
+        _("subtype"),
+        _("is_readme"),
+        _("URL"),
+        _("Timestamp"),
+    ],
+)
 
 st.dataframe(
     df,
@@ -1,3 +1,4 @@
+from collections import defaultdict
 from typing import cast
 
 import streamlit as st
@@ -19,7 +20,7 @@ def display_users(title: str, user_ids: list[str]):
         st.write(f"- **{title}** ({len(users)}): {', '.join(users)}")
 
 
-def display_group(group: Group, all_groups: list[Group]) -> None:
+def display_group(group: Group, subgroups_by_parent: dict[str, list[Group]]) -> None:
     """Display a group and its children."""
     parent = f"{group.parent_group} :arrow_right: " if group.parent_group else ""
     st.write(f"### {parent}{group.name}")
@@ -34,13 +35,35 @@ def display_group(group: Group, all_groups: list[Group]) -> None:
     display_users(_("Delegates"), group.delegate)
     display_users(_("Members"), group.members)
 
-    subgroups = sorted([cg for cg in all_groups if cg.parent_group == group.name])
+    subgroups = sorted(subgroups_by_parent.get(group.name, []))
     if subgroups:
         st.write("#### " + _("Subgroups"))
         for subgroup in subgroups:
             st.write(f"- {subgroup.name} ({len(subgroup.all_members)})")
 
 
+@st.cache_data(ttl=300)
+def get_all_groups() -> list[Group]:
+    return cast(list[Group], Group.get_all())
+
+
+@st.cache_data(ttl=300)
+def get_pages_mentioning(username: str) -> list[CollectivePage]:
+    """Pages mentioning the user, without group pages, newest first."""
+    user_view_result = couchdb().query(
+        "mentions/by_user", key=username, reduce=False, include_docs=True
+    )
+
+    pages = {CollectivePage(**row["doc"]) for row in user_view_result}
+
+    # filter out group pages
+    return sorted(
+        (p for p in pages if not Group.valid_group_names(p.title)),
+        key=lambda p: p.ocs.timestamp or 0,
+        reverse=True,
+    )
+
+
 def add_members(
     group: Group,
     nodes: list[Node],
@@ -49,6 +72,7 @@ def add_members(
     limit_user: str | None = None,
 ) -> None:
     members = [m for m in group.all_members if not limit_user or m == limit_user]
+    roles = member_roles.get(group.name, {})
     for member_name in members:
         user = user_list.get_user_by_uid(member_name)
         if not user:
@@ -56,9 +80,10 @@ def add_members(
 
         member_id = f"{group.name}:{member_name}"
 
-        if member_name in group.coordination:
+        role = roles.get(member_name)
+        if role == "coordination":
             color = "#FF5733"  # Red for coordination
-        elif member_name in group.delegate:
+        elif role == "delegate":
             color = "#33C1FF"  # Blue for delegates
         else:
             color = "#DAA520"  # Goldenrod for regular members
@@ -83,14 +108,28 @@ st.set_page_config(page_title=title, page_icon="⭕", layout="wide")
 
 menu()
 
-db = couchdb()
-
 user_list = NCUserList()
 
 st.title(title)
 
 
-all_groups = cast(list[Group], Group.get_all())
+all_groups = get_all_groups()
+
+# index the subgroups by their parent, the role of each member per group and
+# the groups of each member once, instead of scanning all groups per lookup
+subgroups_by_parent: dict[str, list[Group]] = defaultdict(list)
+member_roles: dict[str, dict[str, str]] = {}
+groups_of_member: dict[str, list[Group]] = defaultdict(list)
+for g in all_groups:
+    if g.parent_group:
+        subgroups_by_parent[g.parent_group].append(g)
+
+    roles = dict.fromkeys(g.delegate, "delegate")
+    roles.update(dict.fromkeys(g.coordination, "coordination"))
+    member_roles[g.name] = roles
+
+    for member_name in g.all_members:
+        groups_of_member[member_name].append(g)
 
 # großgruppe as top_group
 # top_group = next(
@@ -167,7 +206,7 @@ edges = [
 ]
 
 for group in top_level_groups + [top_group]:
-    subgroups = [cg for cg in all_groups if cg.parent_group == group.name]
+    subgroups = subgroups_by_parent.get(group.name, [])
 
     # Filter subgroups if limit_user is set
     if limit_user:
@@ -223,7 +262,7 @@ if selected_node or limit_user or limit_group:
         if not group:
             raise ValueError("Not a group")
 
-        display_group(group, all_groups)
+        display_group(group, subgroups_by_parent)
     except ValueError:
         # person selected show some details
         member_name = selected_node.split(":")[-1] if selected_node else limit_user
@@ -232,30 +271,23 @@ if selected_node or limit_user or limit_group:
         st.write(f"### {user.ocs.displayname}")
 
         st.write("#### " + _("Roles in Groups"))
-        member_of_groups = [g for g in all_groups if member_name in g.all_members]
-        for group in member_of_groups:
+        for group in groups_of_member.get(member_name, []):
+            group_role = member_roles[group.name].get(member_name)
             role = (
                 _("(Coordination)")
-                if member_name in group.coordination
+                if group_role == "coordination"
                 else _("(Delegate)")
-                if member_name in group.delegate
+                if group_role == "delegate"
                 else ""
             )
             st.write(f"- {group.name} {role}")
 
         st.write("#### " + _("Pages mentioning User"))
-        user_view_result = db.query(
-            "mentions/by_user", key=user.username, reduce=False, include_docs=True
-        )
-
-        pages = {CollectivePage(**row["doc"]) for row in user_view_result}
-
-        # filter out group pages
-        pages = {p for p in pages if not Group.valid_group_names(p.title)}
+        pages = get_pages_mentioning(user.username)
 
         st.write(_("Total Mentions: {count}").format(count=len(pages)))
 
-        for page in sorted(pages, key=lambda p: p.ocs.timestamp or 0, reverse=True):
+        for page in pages:
             if not page.content:
                 continue
 
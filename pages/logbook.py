@@ -295,6 +295,7 @@ else:
 
     # Display only the current page of decisions
     page_decisions = decisions[start_idx:end_idx]
+    Decision.prefetch_pages(page_decisions)
     page_distances = distances[start_idx:end_idx] if distances else []
 
     for idx, decision in enumerate(page_decisions):
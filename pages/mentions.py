@@ -1,3 +1,7 @@
+import re
+from collections import defaultdict
+from functools import lru_cache
+
 import pandas as pd
 import streamlit as st
 from streamlit_agraph import Config, Edge, Node, agraph
@@ -6,11 +10,20 @@ from lib.couchdb import couchdb
 from lib.menu import menu
 from lib.nextcloud.models.collective_page import CollectivePage, PageSubtype
 from lib.nextcloud.models.user import NCUser, NCUserList
-from lib.settings import _, settings, user_regex
+from lib.settings import _, settings
 
 node_label_font = "#E0E0E0" if st.context.theme.type == "dark" else "#2C2C2C"
 
 
+@lru_cache(maxsize=256)
+def user_mention_pattern(username: str) -> re.Pattern[str]:
+    """
+    Match the mentions of a single user, but not of longer usernames
+    starting with the same characters (same charset as `user_regex`).
+    """
+    return re.compile(re.escape(f"mention://user/{username}") + r"(?![A-Za-z0-9_.-])")
+
+
 def extract_mention_snippets(
     content: str, username: str, context_chars: int = 500
 ) -> list[str]:
@@ -20,17 +33,16 @@ def extract_mention_snippets(
 
     snippets = []
     # Find all mentions of this user
-    for match in user_regex.finditer(content):
-        if match.group(1) == username:
-            start = max(0, match.start() - context_chars)
-            end = min(len(content), match.end() + context_chars)
-            snippet = content[start:end]
-            # Clean up the snippet
-            if start > 0:
-                snippet = "..." + snippet
-            if end < len(content):
-                snippet = snippet + "..."
-            snippets.append(snippet.replace("\n", " ").strip())
+    for match in user_mention_pattern(username).finditer(content):
+        start = max(0, match.start() - context_chars)
+        end = min(len(content), match.end() + context_chars)
+        snippet = content[start:end]
+        # Clean up the snippet
+        if start > 0:
+            snippet = "..." + snippet
+        if end < len(content):
+            snippet = snippet + "..."
+        snippets.append(snippet.replace("\n", " ").strip())
     return snippets
 
 
@@ -42,50 +54,41 @@ def get_mention_counts(
     db = couchdb()
     mention_counts: list[dict[str, str | int]] = []
 
-    for user in _users:
-        try:
-            user_view_result = db.query(
-                "mentions/by_user", key=user.username, reduce=False, include_docs=True
-            )
-            rows = list(user_view_result)
-            count = len(rows)
-
-            if count > 0:
-                pages: dict[int, CollectivePage] = {}
-                for row in rows:
-                    try:
-                        if "doc" in row:
-                            page = CollectivePage(**row["doc"])
-                            if page.ocs and page.ocs.id:
-                                pages[page.ocs.id] = page
-                    except Exception:
-                        continue
+    # one view query for the rows of the given users, keyed by username,
+    # the values carry the page metadata
+    mentions_by_user: dict[str, list[dict]] = defaultdict(list)
+    usernames = [user.username for user in _users]
+    if usernames:
+        for row in db.query("mention_pages/by_user", keys=usernames):
+            mentions_by_user[row["key"]].append(row["value"])
 
-                distinct_pages_count = len(pages)
-                protocol_count = 0
-                groups: set[str] = set()
-
-                for page in pages.values():
-                    if page.subtype == PageSubtype.PROTOCOL:
-                        protocol_count += 1
-                        if page.title and " " in page.title:
-                            parts = page.title.split(" ", 1)
-                            if len(parts) == 2:
-                                groups.add(parts[1])
-
-                mention_counts.append(
-                    {
-                        "displayname": user.ocs.displayname or user.username,
-                        "username": user.username,
-                        "mentions": count,
-                        "distinct_pages": distinct_pages_count,
-                        "distinct_protocols": protocol_count,
-                        "groups": ", ".join(sorted(groups)),
-                    }
-                )
-        except Exception:
+    for user in _users:
+        mentions = mentions_by_user.get(user.username)
+        if not mentions:
             continue
 
+        pages = {m["page_id"]: m for m in mentions if m.get("page_id")}
+        protocol_count = 0
+        groups: set[str] = set()
+
+        for page in pages.values():
+            if page.get("subtype") == PageSubtype.PROTOCOL:
+                protocol_count += 1
+                title = page.get("title") or ""
+                if " " in title:
+                    groups.add(title.split(" ", 1)[1])
+
+        mention_counts.append(
+            {
+                "displayname": user.ocs.displayname or user.username,
+                "username": user.username,
+                "mentions": len(mentions),
+                "distinct_pages": len(pages),
+                "distinct_protocols": protocol_count,
+                "groups": ", ".join(sorted(groups)),
+            }
+        )
+
     return mention_counts
 
 
@@ -1,4 +1,4 @@
-from typing import Any, Hashable, Tuple
+from typing import Hashable
 
 import pandas as pd
 import plotly.express as px
@@ -23,19 +23,7 @@ user_list = NCUserList()
 st.title(title)
 
 
-page = CollectivePage.get_from_title(settings.nextcloud.timeline_page_name)
-md_text = page.content or ""
-
-if not md_text or not md_text.strip():
-    st.warning(
-        _(
-            "No timeline data found. Please create and populate the '%s' page in Nextcloud Collectives."
-        )
-        % settings.nextcloud.timeline_page_name
-    )
-    st.stop()
-
-
+@st.cache_data(ttl=300)
 def parse_markdown_tables(md_text):
     """Parse headers and their following markdown tables into a dict:
     {header: [row_dict, ...], ...}
@@ -80,102 +68,143 @@ def parse_markdown_tables(md_text):
     return sections
 
 
-sections = parse_markdown_tables(md_text)
+@st.cache_data(ttl=300)
+def get_timeline_text() -> str:
+    """Load the markdown of the timeline page. Cached for 5 minutes."""
+    page = CollectivePage.get_from_title(settings.nextcloud.timeline_page_name)
+    return page.content or ""
 
-tabs = st.tabs(list(sections.keys())) if sections else []
 
-for tab, header in zip(tabs, sections.keys()):
-    with tab:
-        rows = sections.get(header, [])
-        # check if end column exists and has any non-empty values
-        has_end_column = "End" in rows[0].keys()
-
-        parsed = []
-        for r in rows:
-            # normalize keys and lookup case-insensitively
-            key_map = {k.strip().lower(): v for k, v in r.items()}
-            start = key_map.get("start", "").strip() or None
-            end = key_map.get("end", "").strip() or None
-            group = key_map.get("group", "").strip() or header
-            title = key_map.get("title", "").strip() or ""
-
-            # if start missing skip
-            if not start:
-                continue
+@st.cache_data(ttl=300)
+def prepare_timeline_df(
+    header: str, rows: list[dict[str, str]], has_end_column: bool
+) -> tuple[pd.DataFrame, list[str]]:
+    """
+    Build the sorted DataFrame of one timeline section and the order of its
+    y axis. Cached, so reruns of the page skip the date parsing and the
+    track assignment.
+    """
+    y_order: list[str] = []
+
+    today = pd.Timestamp.now().strftime("%Y-%m-%d")
+    parsed = []
+    for r in rows:
+        # normalize keys and lookup case-insensitively
+        key_map = {k.strip().lower(): v for k, v in r.items()}
+        start = key_map.get("start", "").strip() or None
+        end = key_map.get("end", "").strip() or None
+        group = key_map.get("group", "").strip() or header
+        title = key_map.get("title", "").strip() or ""
+
+        # if start missing skip
+        if not start:
+            continue
 
-            # if end missing, set to today
-            if not end:
-                end = pd.Timestamp.now().strftime("%Y-%m-%d")
+        # if end missing, set to today
+        if not end:
+            end = today
 
-            parsed.append({"start": start, "end": end, "group": group, "title": title})
+        parsed.append({"start": start, "end": end, "group": group, "title": title})
 
-        df = pd.DataFrame(parsed)
+    df = pd.DataFrame(parsed)
 
-        if not df.empty:
-            df["start"] = pd.to_datetime(df["start"], errors="coerce")
-            if has_end_column:
-                df["end"] = pd.to_datetime(df["end"], errors="coerce")
-                # where end invalid, set to current date
-                df.loc[df["end"].isna(), "end"] = pd.Timestamp.now()
-            df = df.dropna(subset=["start"])
+    if not df.empty:
+        df["start"] = pd.to_datetime(df["start"], errors="coerce")
+        if has_end_column:
+            df["end"] = pd.to_datetime(df["end"], errors="coerce")
+            # where end invalid, set to current date
+            df.loc[df["end"].isna(), "end"] = pd.Timestamp.now()
+        df = df.dropna(subset=["start"])
 
-            # always show dates in ISO format YYYY-MM-DD for ticks and hover
+        # always show dates in ISO format YYYY-MM-DD in the hover of the bars,
+        # the milestone scatter only shows the title
+        if has_end_column:
             df["start_str"] = df["start"].dt.strftime("%Y-%m-%d")
-            if has_end_column:
-                df["end_str"] = df["end"].dt.strftime("%Y-%m-%d")
+            df["end_str"] = df["end"].dt.strftime("%Y-%m-%d")
 
-            # order rows by group (alphabetically) and then by start date
-            group_order = sorted(
-                df["group"].dropna().unique(), key=lambda s: str(s).lower()
+        # order rows by group (alphabetically) and then by start date
+        group_order = sorted(
+            df["group"].dropna().unique(), key=lambda s: str(s).lower()
+        )
+        df["group"] = pd.Categorical(df["group"], categories=group_order, ordered=True)
+        df = df.sort_values(["group", "start"])
+
+        if has_end_column:
+            # assign track numbers within each group to prevent overlaps, in
+            # one pass as the rows are already sorted by group and start
+            tracks: dict[Hashable, int] = {}
+            track_ends: list[pd.Timestamp] = []
+            current_group = None
+            for idx, group_name, start, end in zip(
+                df.index, df["group"], df["start"], df["end"]
+            ):
+                if group_name != current_group:
+                    current_group = group_name
+                    track_ends = []
+                # find first available track (where track ends before this start)
+                for track, track_end in enumerate(track_ends):
+                    if track_end <= start:
+                        track_ends[track] = end
+                        break
+                else:
+                    # need a new track
+                    track = len(track_ends)
+                    track_ends.append(end)
+                tracks[idx] = track
+
+            # assign tracks back to dataframe, aligned on the index
+            df["track"] = pd.Series(tracks).add(1).astype(str)
+
+            # create y_axis combining group and track
+            df["y_axis"] = (
+                df["group"].astype(str) + " [" + df["track"].astype(str) + "]"
             )
-            df["group"] = pd.Categorical(
-                df["group"], categories=group_order, ordered=True
+
+            # order y_axis categories alphabetically to ensure proper display order
+            y_order = sorted(df["y_axis"].unique(), key=lambda s: str(s).lower())
+            df["y_axis"] = pd.Categorical(
+                df["y_axis"], categories=y_order, ordered=True
             )
-            df = df.sort_values(["group", "start"])
-
-            if has_end_column:
-                # assign track numbers within each group to prevent overlaps
-                tracks_list = []
-                for group_name in group_order:
-                    group_df = df[df["group"] == group_name].copy()
-                    track_ends: list[tuple[int, pd.Timestamp]] = []
-                    for idx, row in group_df.iterrows():
-                        start = row["start"]
-                        end = row["end"]
-                        # find first available track (where track ends before this start)
-                        assigned_track = None
-                        for i, (track_num, track_end) in enumerate(track_ends):
-                            if track_end <= start:
-                                assigned_track = track_num
-                                track_ends[i] = (track_num, end)
-                                break
-                        if assigned_track is None:
-                            # need a new track
-                            assigned_track = len(track_ends)
-                            track_ends.append((assigned_track, end))
-                        tracks_list.append((idx, assigned_track))
-
-                # assign tracks back to dataframe
-                for idx, track in tracks_list:
-                    df.at[idx, "track"] = str(int(track + 1))
-
-                # create y_axis combining group and track
-                df["y_axis"] = (
-                    df["group"].astype(str) + " [" + df["track"].astype(str) + "]"
-                )
-
-                # order y_axis categories alphabetically to ensure proper display order
-                y_order = sorted(df["y_axis"].unique(), key=lambda s: str(s).lower())
-                df["y_axis"] = pd.Categorical(
-                    df["y_axis"], categories=y_order, ordered=True
-                )
-            else:
-                # for events without end dates, use group directly as y_axis
-                df["y_axis"] = df["group"].astype(str)
-                y_order = sorted(df["y_axis"].unique(), key=lambda s: str(s).lower())
-                df["y_axis"] = pd.Categorical(
-                    df["y_axis"], categories=y_order, ordered=True
-                )
+        else:
+            # for events without end dates, use group directly as y_axis; it
+            # already is a categorical in the same alphabetical order
+            df["y_axis"] = df["group"]
+            y_order = group_order
+
+    return df, y_order
+
+
+def spread_offsets(cluster: list[Hashable], span: float = 0.6) -> dict[Hashable, float]:
+    """Spread the events of one cluster evenly around 0 on the y axis."""
+    if len(cluster) == 1:
+        return {cluster[0]: 0.0}
+    step = span / (len(cluster) - 1)
+    return {idx: -span / 2 + i * step for i, idx in enumerate(cluster)}
+
+
+md_text = get_timeline_text()
+
+if not md_text or not md_text.strip():
+    st.warning(
+        _(
+            "No timeline data found. Please create and populate the '%s' page in Nextcloud Collectives."
+        )
+        % settings.nextcloud.timeline_page_name
+    )
+    st.stop()
+
+
+sections = parse_markdown_tables(md_text)
+
+tabs = st.tabs(list(sections.keys())) if sections else []
+
+for tab, header in zip(tabs, sections.keys()):
+    with tab:
+        rows = sections.get(header, [])
+        # check if end column exists and has any non-empty values
+        has_end_column = bool(rows) and "End" in rows[0].keys()
+
+        df, y_order = prepare_timeline_df(header, rows, has_end_column)
 
         if df.empty:
             st.info('No events to display for "%s"' % header)
@@ -223,45 +252,28 @@ for tab, header in zip(tabs, sections.keys()):
             df["y_base"] = 0.0
 
             # Cluster events globally by date (sorted) where cluster span <= 7 days
-            offset_map = {}
-            gr = df.sort_values("start")
-            cluster: list[Tuple[Hashable, Any]] = []
+            offset_map: dict[Hashable, float] = {}
+            week = pd.Timedelta(days=7)
+            starts = df["start"].sort_values()
+            cluster: list[Hashable] = []
             cluster_min = None
-            for idx, row in gr.iterrows():
-                s = row["start"]
-                if not cluster:
-                    cluster = [(idx, s)]
-                    cluster_min = s
-                else:
-                    if (s - cluster_min) <= pd.Timedelta(days=7):
-                        cluster.append((idx, s))
-                    else:
-                        # assign offsets for existing cluster
-                        n = len(cluster)
-                        if n == 1:
-                            offset_map[cluster[0][0]] = 0.0
-                        else:
-                            span = 0.6
-                            step = span / max(n - 1, 1)
-                            start_off = -span / 2
-                            for i, (cidx, _) in enumerate(cluster):
-                                offset_map[cidx] = start_off + i * step
-                        cluster = [(idx, s)]
-                        cluster_min = s
+            for idx, s in zip(starts.index, starts):
+                if cluster and (s - cluster_min) <= week:
+                    cluster.append(idx)
+                    continue
+                # assign offsets for the finished cluster and start a new one
+                if cluster:
+                    offset_map.update(spread_offsets(cluster))
+                cluster = [idx]
+                cluster_min = s
             # finalize last cluster
             if cluster:
-                n = len(cluster)
-                if n == 1:
-                    offset_map[cluster[0][0]] = 0.0
-                else:
-                    span = 0.6
-                    step = span / max(n - 1, 1)
-                    start_off = -span / 2
-                    for i, (cidx, _) in enumerate(cluster):
-                        offset_map[cidx] = start_off + i * step
+                offset_map.update(spread_offsets(cluster))
 
             # apply offsets to build final numeric y positions around 0
-            df["y_pos"] = df.index.map(lambda idx: 0.0 + offset_map.get(idx, 0.0))
+            df["y_pos"] = pd.Series(offset_map, dtype=float).reindex(
+                df.index, fill_value=0.0
+            )
 
             # build scatter with numeric y positions (no color/group)
             fig = px.scatter(
@@ -288,22 +300,30 @@ for tab, header in zip(tabs, sections.keys()):
             )
             # (no baseline line drawn for scatter-only charts)
 
-            # Add rotated text annotations at the adjusted positions
-            for idx, row in df.iterrows():
-                fig.add_annotation(
-                    x=row["start"],
-                    y=row["y_pos"],
-                    text=row["title"],
-                    textangle=-45,
-                    showarrow=False,
-                    xanchor="left",
-                    yanchor="bottom",
-                    font=dict(size=12),
-                )
+            # Add rotated text annotations at the adjusted positions, all at
+            # once: add_annotation re-validates the whole list on every call
+            fig.update_layout(
+                annotations=[
+                    dict(
+                        x=start,
+                        y=y_pos,
+                        text=title,
+                        textangle=-45,
+                        showarrow=False,
+                        xanchor="left",
+                        yanchor="bottom",
+                        font=dict(size=12),
+                    )
+                    for start, y_pos, title in zip(
+                        df["start"], df["y_pos"], df["title"]
+                    )
+                ]
+            )
 
             # set default view range to 1 year window for scatter-only charts
-            min_date = df["start"].max() - pd.DateOffset(years=1)
-            max_date = df["start"].max() + pd.DateOffset(months=2)
+            last_start = df["start"].max()
+            min_date = last_start - pd.DateOffset(years=1)
+            max_date = last_start + pd.DateOffset(months=2)
             fig.update_xaxes(range=[min_date, max_date])
             # show vertical grid lines aligned with x-axis tick labels
             fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor="lightgray")
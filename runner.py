@@ -1,11 +1,12 @@
 import logging
+import threading
 import time
 from datetime import datetime
 
 import click
 import requests
 
-from lib.chromadb import UNIFIED_COLLECTION_NAME, chroma_client
+from lib.chromadb import UNIFIED_COLLECTION_NAME, chroma_client, warmup_embedding
 from lib.mail.fetcher import MailFetcher
 from lib.nextcloud.avatar_fetcher import AvatarFetcher
 from lib.nextcloud.calendar_notifier import Notifier
@@ -66,8 +67,20 @@ def process_pages(updated_pages: list[CollectivePage], force_save: bool):
         for page in updated_pages:
             page.save()
 
+    # groups are saved in bulk, protocols look them up afterwards
+    groups: list[Group] = []
     for page in updated_pages:
-        parse_groups(page)
+        try:
+            group = parse_groups(page, save=False)
+        except Exception as e:
+            # keep the groups of the other pages
+            logger.exception("Failed to parse group of page %s: %s", page.title, e)
+            continue
+        if group is not None:
+            groups.append(group)
+
+    if groups:
+        Group.save_many(groups)
 
     for page in updated_pages:
         parse_protocols(page)
@@ -165,6 +178,8 @@ def main(
         return
 
     fetcher = MailFetcher()
+    Group.warm_cache()
+    threading.Thread(target=warmup_embedding, daemon=True).start()
 
     while True:
         try:
@@ -7,7 +7,8 @@ can run without external services.
 
 import os
 import sys
-from unittest.mock import MagicMock
+from contextlib import ExitStack
+from unittest.mock import MagicMock, patch
 
 import pytest
 
@@ -58,3 +59,26 @@ def reset_mocks():
     _mock_chroma_client.reset_mock()
     _mock_chroma_collection.reset_mock()
     yield
+
+
+@pytest.fixture
+def mock_collection():
+    """Patch the ChromaDB collection, enable embeddings and skip CouchDB saves."""
+    collection = MagicMock()
+    with ExitStack() as stack:
+        for module in (
+            "lib.nextcloud.models.decision",
+            "lib.nextcloud.models.collective_page",
+        ):
+            stack.enter_context(patch(f"{module}.embedding_function", MagicMock()))
+            stack.enter_context(
+                patch(f"{module}.get_unified_collection", return_value=collection)
+            )
+        stack.enter_context(
+            patch(
+                "lib.nextcloud.models.group.Group.get_for_page",
+                side_effect=ValueError,
+            )
+        )
+        stack.enter_context(patch("lib.nextcloud.models.base.CouchDBModel.save"))
+        yield collection
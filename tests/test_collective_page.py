@@ -0,0 +1,115 @@
+"""Unit tests for CollectivePage persistence and embedding updates."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from lib.nextcloud.models.base import CouchDBModel
+from lib.nextcloud.models.collective_page import (
+    UPSERT_BATCH_SIZE,
+    CollectivePage,
+    OCSCollectivePage,
+)
+
+
+class TestCollectivePageEmbedding:
+    """Test suite for CollectivePage.save() ChromaDB updates."""
+
+    def test_chunks_are_upserted_in_one_request(self, mock_collection):
+        """Test that all chunks of a page are sent with a single upsert."""
+        page = CollectivePage(
+            ocs=OCSCollectivePage(id=7, title="Page"),
+            content="\n\n".join(["word " * 100] * 5),
+        )
+        page.save()
+
+        mock_collection.upsert.assert_called_once()
+        kwargs = mock_collection.upsert.call_args.kwargs
+        assert len(kwargs["ids"]) == len(kwargs["documents"]) > 1
+        assert kwargs["ids"][0] == f"{page.build_id()}_chunk_0"
+        assert [m["chunk_index"] for m in kwargs["metadatas"]] == list(
+            range(len(kwargs["ids"]))
+        )
+
+    def test_chunks_are_split_into_batches(self, mock_collection):
+        """Test that pages with many chunks are upserted in bounded batches."""
+        chunks = [f"chunk {i}" for i in range(UPSERT_BATCH_SIZE + 1)]
+        page = CollectivePage(ocs=OCSCollectivePage(id=7, title="Page"), content="x")
+
+        with patch(
+            "lib.nextcloud.models.collective_page.text_splitter.split_text",
+            return_value=chunks,
+        ):
+            page.save()
+
+        assert mock_collection.upsert.call_count == 2
+        second = mock_collection.upsert.call_args_list[1].kwargs
+        assert second["documents"] == chunks[UPSERT_BATCH_SIZE:]
+        assert second["metadatas"][0]["total_chunks"] == len(chunks)
+
+    def test_unchanged_page_is_not_sent_again(self, mock_collection):
+        """Test that saving an unchanged page does not re-embed its content."""
+        page = CollectivePage(ocs=OCSCollectivePage(id=7, title="Page"), content="x")
+        page.save()
+        mock_collection.reset_mock()
+
+        page.save()
+
+        mock_collection.upsert.assert_not_called()
+
+    def test_changed_page_is_reembedded(self, mock_collection):
+        """Test that changing content or metadata triggers a new upsert."""
+        page = CollectivePage(ocs=OCSCollectivePage(id=7, title="Page"), content="x")
+        page.save()
+        mock_collection.reset_mock()
+
+        page.content = "y"
+        page.save()
+        page.ocs.title = "Renamed"
+        page.save()
+
+        assert mock_collection.upsert.call_count == 2
+
+    def test_failed_upsert_does_not_block_save(self, mock_collection):
+        """Test that the page is saved before embedding and the hash only after."""
+        mock_collection.upsert.side_effect = RuntimeError("unavailable")
+        page = CollectivePage(ocs=OCSCollectivePage(id=7, title="Page"), content="x")
+
+        with patch.object(CouchDBModel, "save") as mock_save:
+            with pytest.raises(RuntimeError):
+                page.save()
+
+        mock_save.assert_called_once_with(skip_set_updated_at=False)
+        assert page.content_hash == ""
+
+    def test_hash_is_saved_after_upsert(self, mock_collection):
+        """Test that the content hash is persisted by a follow-up save."""
+        page = CollectivePage(ocs=OCSCollectivePage(id=7, title="Page"), content="x")
+
+        with patch.object(CouchDBModel, "save") as mock_save:
+            page.save()
+
+        assert mock_save.call_args_list[1].kwargs == {"skip_set_updated_at": True}
+        assert page.content_hash
+
+
+class TestCollectivePageLookup:
+    """Test suite for CollectivePage.get_from_page_id()."""
+
+    def test_repeated_lookup_is_served_from_cache(self):
+        """Test that looking up the same page twice queries CouchDB once."""
+        page = CollectivePage(ocs=OCSCollectivePage(id=42, title="Page"))
+        page.id = page.build_id()
+        doc = page.model_dump() | {"_id": page.id, "type": "CollectivePage"}
+        db = MagicMock()
+        db.get.return_value = doc
+
+        CouchDBModel.clear_cache()
+        with patch("lib.nextcloud.models.base.couchdb", return_value=db):
+            first = CollectivePage.get_from_page_id(42)
+            second = CollectivePage.get_from_page_id(42)
+        CouchDBModel.clear_cache()
+
+        db.get.assert_called_once_with(page.id)
+        assert first is second
+        assert first.ocs.title == "Page"
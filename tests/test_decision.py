@@ -0,0 +1,225 @@
+"""Unit tests for Decision persistence and embedding updates."""
+
+from unittest.mock import MagicMock, patch
+
+from lib.nextcloud.models.base import CouchDBModel
+from lib.nextcloud.models.decision import Decision
+
+
+class TestDecisionEmbedding:
+    """Test suite for Decision.save() ChromaDB updates."""
+
+    def test_first_save_upserts_document(self, mock_collection):
+        """Test that a new decision is embedded and its content hash stored."""
+        decision = Decision(title="Budget", text="Approved", date="2024-11-07")
+        decision.save()
+
+        mock_collection.upsert.assert_called_once()
+        mock_collection.update.assert_not_called()
+        assert decision.content_hash
+
+    def test_unchanged_content_updates_metadata_only(self, mock_collection):
+        """Test that saving unchanged content does not re-embed the document."""
+        decision = Decision(title="Budget", text="Approved", date="2024-11-07")
+        decision.save()
+        mock_collection.reset_mock()
+
+        decision.group_name = "AG Finance"
+        decision.save()
+
+        mock_collection.upsert.assert_not_called()
+        mock_collection.update.assert_called_once()
+        assert "documents" not in mock_collection.update.call_args.kwargs
+
+    def test_unchanged_decision_is_not_sent_again(self, mock_collection):
+        """Test that saving without changes to content or metadata is skipped."""
+        decision = Decision(title="Budget", text="Approved", date="2024-11-07")
+        decision.save()
+        mock_collection.reset_mock()
+
+        decision.valid_until = "2025-12-31"
+        decision.save()
+
+        mock_collection.upsert.assert_not_called()
+        mock_collection.update.assert_not_called()
+
+    def test_changed_content_is_reembedded(self, mock_collection):
+        """Test that changing the text triggers a new embedding."""
+        decision = Decision(title="Budget", text="Approved", date="2024-11-07")
+        decision.save()
+        first_hash = decision.content_hash
+        mock_collection.reset_mock()
+
+        decision.text = "Rejected"
+        decision.save()
+
+        mock_collection.upsert.assert_called_once()
+        assert decision.content_hash != first_hash
+
+    def test_failed_upsert_is_retried_on_next_save(self, mock_collection):
+        """Test that the content hash is only stored after a successful upsert."""
+        mock_collection.upsert.side_effect = [RuntimeError("unavailable"), None]
+        decision = Decision(title="Budget", text="Approved", date="2024-11-07")
+        decision.save()
+
+        assert decision.content_hash == ""
+
+        decision.save()
+
+        assert mock_collection.upsert.call_count == 2
+        assert decision.content_hash
+
+    def test_document_joins_title_and_text_with_newline(self, mock_collection):
+        """Test that the embedded document separates title and text by a newline."""
+        decision = Decision(title="Budget", text="Approved", date="2024-11-07")
+        decision.save()
+
+        documents = mock_collection.upsert.call_args.kwargs["documents"]
+        assert documents == ["Budget\nApproved"]
+
+    def test_delete_removes_document(self, mock_collection):
+        """Test that deleting a decision removes it from the collection."""
+        decision = Decision(title="Budget", text="Approved", date="2024-11-07")
+        with patch.object(CouchDBModel, "delete"):
+            decision.delete()
+
+        mock_collection.delete.assert_called_once_with(ids=[decision.id_str])
+
+    def test_bulk_delete_removes_all_matching_documents(self, mock_collection):
+        """Test that matching decisions are deleted with one bulk request."""
+        docs = [
+            {"_id": "d1", "_rev": "1-a", "title": "A", "date": "2024-11-07"},
+            {"_id": "d2", "_rev": "1-b", "title": "B", "date": "2024-11-07"},
+        ]
+        db = MagicMock()
+
+        with patch("lib.nextcloud.models.base.find", return_value={"docs": docs}):
+            with patch("lib.nextcloud.models.base.couchdb", return_value=db):
+                Decision.bulk_delete(selector={"page_id": 1})
+
+        db.delete_bulk.assert_called_once_with(
+            [{"_id": "d1", "_rev": "1-a"}, {"_id": "d2", "_rev": "1-b"}],
+            transaction=False,
+        )
+        mock_collection.delete.assert_called_once_with(
+            ids=["Decision:None:A", "Decision:None:B"]
+        )
+
+    def test_bulk_delete_follows_bookmark(self, mock_collection):
+        """Test that matches beyond one batch are deleted as well."""
+        docs = [
+            {"_id": f"d{i}", "_rev": "1-a", "title": f"T{i}", "date": "2024-11-07"}
+            for i in range(3)
+        ]
+        db = MagicMock()
+
+        with patch(
+            "lib.nextcloud.models.base.find",
+            side_effect=[
+                {"docs": docs[:2], "bookmark": "b1"},
+                {"docs": docs[2:], "bookmark": "b2"},
+            ],
+        ) as mock_find:
+            with patch("lib.nextcloud.models.base.couchdb", return_value=db):
+                deleted = Decision.bulk_delete(selector={"page_id": 1}, batch_size=2)
+
+        assert deleted == docs
+        assert mock_find.call_args_list[1].args[0]["bookmark"] == "b1"
+        assert [len(c.args[0]) for c in db.delete_bulk.call_args_list] == [2, 1]
+
+
+class TestDecisionPrefetchPages:
+    """Test suite for Decision.prefetch_pages()."""
+
+    def test_pages_loaded_with_single_query(self):
+        """Test that pages of all decisions are fetched in one call."""
+        decisions = [
+            Decision(title="A", date="2024-11-07", page_id=1),
+            Decision(title="B", date="2024-11-07", page_id=1),
+            Decision(title="C", date="2024-11-07", page_id=2),
+            Decision(title="D", date="2024-11-07"),
+        ]
+        page = MagicMock()
+
+        with patch(
+            "lib.nextcloud.models.decision.CollectivePage.get_many"
+        ) as mock_get_many:
+            mock_get_many.side_effect = lambda ids: {ids[0]: page}
+            Decision.prefetch_pages(decisions)
+
+        mock_get_many.assert_called_once()
+        assert len(mock_get_many.call_args.args[0]) == 2
+        assert decisions[0].page is page
+        assert decisions[1].page is page
+        assert decisions[2].page is None
+        assert decisions[3].page is None
+
+
+class TestDecisionSearch:
+    """Test suite for case insensitive text search on decisions."""
+
+    def test_contains_is_case_insensitive(self):
+        """Test that membership checks ignore case and surrounding whitespace."""
+        decision = Decision(title="Budget 2025", text="Approved", date="2024-11-07")
+
+        assert " budget " in decision
+        assert "APPROVED" in decision
+        assert "rejected" not in decision
+
+    def test_contains_reflects_changed_text(self):
+        """Test that the cached lowercase text is refreshed after a change."""
+        decision = Decision(title="Budget", text="Approved", date="2024-11-07")
+        assert "approved" in decision
+
+        decision.text = "Rejected"
+
+        assert "approved" not in decision
+        assert "rejected" in decision
+
+    def test_filter_containing(self):
+        """Test that only decisions containing the term are returned."""
+        decisions = [
+            Decision(title="Budget", text="Approved", date="2024-11-07"),
+            Decision(title="Garden", text="New budget line", date="2024-11-07"),
+            Decision(title="Party", text="Friday", date="2024-11-07"),
+        ]
+
+        result = Decision.filter_containing(decisions, "BUDGET")
+
+        assert result == decisions[:2]
+
+
+class TestDecisionFromDoc:
+    """Test suite for Decision.from_doc()."""
+
+    def test_current_revision_is_used(self):
+        """Test that _id and _rev win over the stored id and rev fields."""
+        doc = {
+            "_id": "Decision:1:Budget",
+            "_rev": "2-b",
+            "id": "Decision:1:Budget",
+            "rev": "1-a",
+            "title": "Budget",
+            "date": "2024-11-07",
+        }
+
+        decision = Decision.from_doc(doc)
+
+        assert decision.id == "Decision:1:Budget"
+        assert decision.rev == "2-b"
+
+
+class TestDecisionSelector:
+    """Test suite for the selectors of Decision queries."""
+
+    def test_model_type_is_not_overridden(self):
+        """Test that a type in the caller's selector does not replace the model type."""
+        with patch(
+            "lib.nextcloud.models.base.find", return_value={"docs": []}
+        ) as mock_find:
+            Decision.get_all(selector={"type": "Protocol", "page_id": 1})
+
+        assert mock_find.call_args.args[0]["selector"] == {
+            "type": "Decision",
+            "page_id": 1,
+        }
@@ -5,6 +5,7 @@ from unittest.mock import MagicMock, Mock, patch
 import pytest
 
 from lib.nextcloud.config import OrganisationConfig
+from lib.nextcloud.models.base import scan_lines
 from lib.nextcloud.models.collective_page import CollectivePage
 from lib.nextcloud.models.group import Group
 
@@ -139,6 +140,26 @@ mention://user/alice
                     # Should be sorted alphabetically
                     assert mock_group.short_names == sorted(mock_group.short_names)
 
+    def test_reparse_does_not_duplicate_shortnames(
+        self, mock_group, mock_page, mock_bot_config
+    ):
+        """Test that parsing the same page twice keeps shortnames unique."""
+        with patch("lib.nextcloud.models.group.bot_config", mock_bot_config):
+            mock_page.content = """
+# AG Test Group
+
+**Kurznamen:** Test, test, AG-Test
+"""
+
+            with patch.object(
+                CollectivePage, "get_from_page_id", return_value=mock_page
+            ):
+                with patch.object(Group, "save"):
+                    mock_group.update_from_page()
+                    mock_group.update_from_page()
+
+                    assert mock_group.short_names == ["ag-test", "test"]
+
 
 class TestGroupMemberParsing:
     """Test suite for Group member/coordination/delegate parsing."""
@@ -167,6 +188,24 @@ mention://user/charlie
                     assert "bob" in mock_group.coordination
                     assert "charlie" not in mock_group.coordination
 
+    def test_configured_keywords_are_case_insensitive(
+        self, mock_group, mock_page, mock_bot_config
+    ):
+        """Test that keywords configured with capitals still match."""
+        mock_bot_config.organisation = OrganisationConfig(
+            coordination_person_keywords=["Leitung"]
+        )
+        with patch("lib.nextcloud.models.group.bot_config", mock_bot_config):
+            mock_page.content = "Leitung: mention://user/alice\n"
+
+            with patch.object(
+                CollectivePage, "get_from_page_id", return_value=mock_page
+            ):
+                with patch.object(Group, "save"):
+                    mock_group.update_from_page()
+
+        assert mock_group.coordination == ["alice"]
+
     def test_parse_delegates(self, mock_group, mock_page, mock_bot_config):
         """Test parsing delegate members from page content."""
         with patch("lib.nextcloud.models.group.bot_config", mock_bot_config):
@@ -445,3 +484,81 @@ mention://user/charlie
                     mock_group.update_from_page()
 
                     assert "charlie" in mock_group.members
+
+    def test_keyword_configured_twice_counts_as_coordination(
+        self, mock_group, mock_page
+    ):
+        """Test that coordination wins if a keyword is also a member keyword."""
+        config = MagicMock()
+        config.organisation = OrganisationConfig(
+            coordination_person_keywords=["Team"],
+            member_person_keywords=["Team"],
+        )
+        mock_page.content = "**Team:** mention://user/alice\n"
+
+        with patch("lib.nextcloud.models.group.bot_config", config):
+            with patch.object(
+                CollectivePage, "get_from_page_id", return_value=mock_page
+            ):
+                with patch.object(Group, "save"):
+                    mock_group.update_from_page()
+
+        assert mock_group.coordination == ["alice"]
+        assert mock_group.members == []
+
+
+class TestGroupBulkSave:
+    """Test suite for saving parsed groups in bulk."""
+
+    def test_update_without_save(self, mock_group, mock_page, mock_bot_config):
+        """Test that save=False leaves saving to the caller."""
+        mock_page.content = "Mitglieder\nmention://user/alice\n"
+
+        with patch("lib.nextcloud.models.group.bot_config", mock_bot_config):
+            with patch.object(
+                CollectivePage, "get_from_page_id", return_value=mock_page
+            ):
+                with patch.object(Group, "save") as mock_save:
+                    mock_group.update_from_page(save=False)
+
+        mock_save.assert_not_called()
+        assert mock_group.members == ["alice"]
+
+    def test_save_many_invalidates_cache(self, mock_group):
+        """Test that saving several groups at once resets the group cache."""
+        Group._cached_groups = [mock_group]
+        db = MagicMock()
+        db.all.return_value = []
+        db.save_bulk.side_effect = lambda docs, transaction: docs
+
+        with patch("lib.nextcloud.models.base.couchdb", return_value=db):
+            Group.save_many([mock_group])
+
+        db.save_bulk.assert_called_once()
+        assert Group._cached_groups is None
+
+
+class TestScanLines:
+    """Test suite for the single-pass line scanner used by the parsers."""
+
+    def test_skips_lines_without_words(self):
+        """Test that empty and punctuation-only lines are not yielded."""
+        content = "\n---\n  **  \n## Mitglieder\n\n* mention://user/alice\n"
+
+        lines = list(scan_lines(content))
+
+        assert [first_word for first_word, _, _ in lines] == ["mitglieder", "mention"]
+
+    def test_first_word_ignores_leading_markdown(self):
+        """Test that markdown punctuation before the first word is skipped."""
+        lines = list(scan_lines("**Koordination:** mention://user/bob"))
+
+        assert lines == [("koordination", ["bob"], 0)]
+
+    def test_collects_all_mentions_of_a_line(self):
+        """Test that every mention on a line is returned, including a leading one."""
+        content = "Intro\nmention://user/alice, mention://user/bob\n"
+
+        lines = list(scan_lines(content))
+
+        assert lines[1] == ("mention", ["alice", "bob"], 6)
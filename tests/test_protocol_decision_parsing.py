@@ -8,7 +8,26 @@ import pytest
 from lib.nextcloud.config import OrganisationConfig
 from lib.nextcloud.models.base import CouchDBModel
 from lib.nextcloud.models.decision import Decision
-from lib.nextcloud.models.protocol import Protocol
+from lib.nextcloud.models.protocol import (
+    Protocol,
+    _genai_client,
+    find_decision_blocks,
+    keyword_prefix_pattern,
+)
+
+
+def stored_copy(decision: Decision) -> Decision:
+    """Return the decision as it is loaded back from CouchDB."""
+    doc = decision.model_dump() | {"_id": decision.build_id(), "_rev": "1-a"}
+    return Decision.from_doc(doc)
+
+
+@pytest.fixture(autouse=True)
+def stored_decisions():
+    """Patch the decisions already stored for a page, none by default."""
+    stored: list[Decision] = []
+    with patch.object(Decision, "iter_all", side_effect=lambda **kwargs: iter(stored)):
+        yield stored
 
 
 @pytest.fixture
@@ -84,7 +103,7 @@ This is the decision text.
 """
 
             with patch.object(Protocol, "page", property(lambda self: mock_page)):
-                with patch.object(Decision, "get_all", return_value=[]):
+                with patch.object(Decision, "bulk_delete", return_value=[]):
                     with patch.object(Decision, "save"):
                         mock_protocol.extract_decisions()
                         # Decision extraction completed successfully
@@ -111,11 +130,33 @@ Text for second decision.
 """
 
             with patch.object(Protocol, "page", property(lambda self: mock_page)):
-                with patch.object(Decision, "get_all", return_value=[]):
+                with patch.object(Decision, "bulk_delete", return_value=[]):
                     with patch.object(Decision, "save"):
                         mock_protocol.extract_decisions()
                         # Multiple decisions extracted successfully
 
+    def test_unclosed_decision_block_is_ignored(
+        self, mock_protocol, mock_page, mock_bot_config
+    ):
+        """Test that a trailing block without closing fence yields no decision."""
+        with patch("lib.nextcloud.models.protocol.bot_config", mock_bot_config):
+            mock_page.content = (
+                """
+::: success
+**Decision:** Closed decision
+:::
+"""
+                + "::: success\n**Decision:** Unclosed\n"
+                + "text\n" * 10_000
+            )
+
+            with patch.object(Protocol, "page", property(lambda self: mock_page)):
+                with patch.object(Decision, "bulk_delete", return_value=[]):
+                    with patch.object(Decision, "save"):
+                        decisions = mock_protocol.extract_decisions()
+
+                        assert [d.title for d in decisions] == ["Closed decision"]
+
     def test_skip_extraction_for_future_protocols(
         self, mock_protocol, mock_page, mock_bot_config
     ):
@@ -144,10 +185,63 @@ Text for second decision.
                     # Verify no decisions were saved
                     assert len(decision_saved) == 0
 
-    def test_delete_existing_decisions_before_extraction(
+    def test_future_is_relative_to_given_day(
+        self, mock_protocol, mock_page, mock_bot_config
+    ):
+        """Test that a protocol is only skipped if it is after the given day."""
+        mock_protocol.date = "2024-11-07"
+        mock_page.content = """
+::: success
+**Decision:** Some decision
+:::
+"""
+
+        with patch.object(Protocol, "page", property(lambda self: mock_page)):
+            with patch.object(Decision, "bulk_delete", return_value=[]):
+                with patch.object(Decision, "save"):
+                    before = mock_protocol.extract_decisions(
+                        today=datetime(2024, 11, 6).date()
+                    )
+                    on_day = mock_protocol.extract_decisions(
+                        today=datetime(2024, 11, 7).date()
+                    )
+
+        assert before == []
+        assert [d.title for d in on_day] == ["Some decision"]
+
+    def test_removed_decisions_are_deleted(
+        self, mock_protocol, mock_page, mock_bot_config, stored_decisions
+    ):
+        """Test that only decisions no longer in the protocol are deleted."""
+        kept = Decision(title="Kept decision", date="2024-11-07", page_id=12345)
+        removed = Decision(title="Old decision", date="2024-11-07", page_id=12345)
+        for d in (kept, removed):
+            d.id = d.build_id()
+        stored_decisions.extend([kept, removed])
+
+        with patch("lib.nextcloud.models.protocol.bot_config", mock_bot_config):
+            mock_page.content = """
+::: success
+**Decision:** Kept decision
+:::
+"""
+
+            with patch.object(Protocol, "page", property(lambda self: mock_page)):
+                with patch.object(Decision, "bulk_delete") as mock_bulk_delete:
+                    with patch.object(Decision, "save"):
+                        mock_protocol.extract_decisions()
+
+        mock_bulk_delete.assert_called_once_with(
+            selector={
+                "page_id": mock_protocol.page_id,
+                "_id": {"$in": [removed.id]},
+            }
+        )
+
+    def test_nothing_is_deleted_without_removed_decisions(
         self, mock_protocol, mock_page, mock_bot_config
     ):
-        """Test that existing decisions are deleted before extracting new ones."""
+        """Test that no delete request is sent when no decision was removed."""
         with patch("lib.nextcloud.models.protocol.bot_config", mock_bot_config):
             mock_page.content = """
 ::: success
@@ -155,20 +249,70 @@ Text for second decision.
 :::
 """
 
-            # Mock existing decisions
-            mock_decision1 = Mock()
-            mock_decision2 = Mock()
-
             with patch.object(Protocol, "page", property(lambda self: mock_page)):
-                with patch.object(
-                    Decision, "get_all", return_value=[mock_decision1, mock_decision2]
-                ):
+                with patch.object(Decision, "bulk_delete") as mock_bulk_delete:
                     with patch.object(Decision, "save"):
                         mock_protocol.extract_decisions()
 
-                        # Verify existing decisions were deleted
-                        mock_decision1.delete.assert_called_once()
-                        mock_decision2.delete.assert_called_once()
+        mock_bulk_delete.assert_not_called()
+
+    def test_unchanged_protocol_is_not_embedded_again(
+        self,
+        mock_protocol,
+        mock_page,
+        mock_bot_config,
+        stored_decisions,
+        mock_collection,
+    ):
+        """Test that re-extracting an unchanged protocol does not re-embed it."""
+        mock_page.content = """
+::: success
+**Decision:** Approve the budget
+The budget is approved.
+:::
+"""
+        with patch("lib.nextcloud.models.protocol.bot_config", mock_bot_config):
+            with patch.object(Protocol, "page", property(lambda self: mock_page)):
+                first = mock_protocol.extract_decisions()
+                stored_decisions.extend(stored_copy(d) for d in first)
+                mock_collection.reset_mock()
+
+                second = mock_protocol.extract_decisions()
+
+        mock_collection.upsert.assert_not_called()
+        mock_collection.update.assert_not_called()
+        mock_collection.delete.assert_not_called()
+        assert second[0].rev == "1-a"
+
+    def test_changed_metadata_is_updated_without_embedding(
+        self,
+        mock_protocol,
+        mock_page,
+        mock_bot_config,
+        stored_decisions,
+        mock_collection,
+    ):
+        """Test that a re-extracted decision with new metadata is only updated."""
+        mock_page.content = """
+::: success
+**Decision:** Approve the budget
+The budget is approved.
+:::
+"""
+        with patch("lib.nextcloud.models.protocol.bot_config", mock_bot_config):
+            with patch.object(Protocol, "page", property(lambda self: mock_page)):
+                first = mock_protocol.extract_decisions()
+                stored_decisions.extend(stored_copy(d) for d in first)
+                mock_collection.reset_mock()
+
+                mock_protocol.date = "2024-11-08 Meeting"
+                mock_protocol.extract_decisions()
+
+        mock_collection.upsert.assert_not_called()
+        mock_collection.update.assert_called_once()
+        assert mock_collection.update.call_args.kwargs["metadatas"][0]["date"] == (
+            "2024-11-08 Meeting"
+        )
 
     def test_no_content_returns_early(self, mock_protocol, mock_page, mock_bot_config):
         """Test that extract_decisions returns early if page has no content."""
@@ -176,11 +320,11 @@ Text for second decision.
             mock_page.content = None
 
             with patch.object(Protocol, "page", property(lambda self: mock_page)):
-                with patch.object(Decision, "get_all") as mock_get_all:
+                with patch.object(Decision, "bulk_delete") as mock_bulk_delete:
                     mock_protocol.extract_decisions()
 
-                    # Verify get_all was not called (early return)
-                    mock_get_all.assert_not_called()
+                    # Verify bulk_delete was not called (early return)
+                    mock_bulk_delete.assert_not_called()
 
 
 class TestProtocolSaveDecision:
@@ -277,6 +421,32 @@ Einwände: John disagrees with this decision
                 mock_decision_instance.objections == "John disagrees with this decision"
             )
 
+    def test_empty_keyword_lists_match_no_lines(
+        self,
+        mock_protocol,
+        mock_bot_config,
+        mock_decision_class,
+        mock_decision_instance,
+    ):
+        """Test that empty keyword lists do not treat every line as metadata."""
+        mock_bot_config.organisation = mock_bot_config.organisation.model_copy(
+            update={
+                "decision_title_keywords": [],
+                "decision_valid_until_keywords": [],
+                "decision_objection_keywords": [],
+            }
+        )
+        with patch("lib.nextcloud.models.protocol.bot_config", mock_bot_config):
+            block = """
+Approve the budget
+We will approve the budget for next year.
+"""
+            mock_protocol.save_decision(block)
+
+            assert mock_decision_class.call_args[1]["title"] == "Approve the budget"
+            assert mock_decision_instance.valid_until is None
+            assert mock_decision_instance.objections is None
+
     def test_remove_metadata_lines_from_text(
         self,
         mock_protocol,
@@ -381,37 +551,88 @@ class TestProtocolValidTitle:
             "2024-11-07",  # No title
             "2024/11/07 Meeting",  # Wrong date format
             "11-07-2024 Meeting",  # Wrong date order
+            "20241107 Meeting",  # Missing separators
+            "2024-W45-4 Meeting",  # Week date
+            "2024-02-30 Meeting",  # Not a calendar date
         ]
 
         for title in invalid_titles:
             assert not Protocol.valid_date(title), f"'{title}' should be invalid"
 
 
+class TestProtocolPageDetection:
+    """Test suite for Protocol.is_protocol_page()."""
+
+    @pytest.mark.parametrize(
+        "file_path,is_readme,expected",
+        [
+            ("AG Test/Protokolle/2024-11-07 AG Test", True, True),
+            ("AG Test/protocols", False, True),
+            ("Protokolle", False, True),
+            ("Protokolle", True, False),
+            ("AG Test/Notes/2024-11-07 AG Test", True, False),
+            ("AG Test/Notes", False, False),
+        ],
+    )
+    def test_is_protocol_page(self, mock_bot_config, file_path, is_readme, expected):
+        """Test detection by the parent folder of readmes or the last segment."""
+        page = Mock()
+        page.ocs.filePath = file_path
+        page.is_readme = is_readme
+
+        with patch("lib.nextcloud.models.protocol.bot_config", mock_bot_config):
+            assert Protocol.is_protocol_page(page) is expected
+
+
+class TestProtocolCachedLookups:
+    """Test suite for the cached lookups of a Protocol."""
+
+    def test_group_follows_group_id(self, mock_protocol):
+        """Test that the cached group is refreshed when group_id changes."""
+        first, second = Mock(), Mock()
+
+        with patch("lib.nextcloud.models.protocol.Group") as MockGroup:
+            MockGroup.get.side_effect = lambda group_id: {
+                "group_123": first,
+                "group_456": second,
+            }[group_id]
+            assert mock_protocol.group is first
+            assert mock_protocol.group is first
+
+            mock_protocol.group_id = "group_456"
+
+            assert mock_protocol.group is second
+        assert MockGroup.get.call_count == 2
+
+    def test_date_obj_follows_date(self, mock_protocol):
+        """Test that the cached date is refreshed when the date changes."""
+        assert mock_protocol.date_obj == datetime(2024, 11, 7).date()
+
+        mock_protocol.date = "2024-12-01"
+
+        assert mock_protocol.date_obj == datetime(2024, 12, 1).date()
+
+
 class TestProtocolDelete:
     """Test suite for Protocol.delete() method."""
 
     def test_delete_protocol_and_decisions(self, mock_protocol, mock_bot_config):
         """Test that deleting protocol also deletes associated decisions."""
         with patch("lib.nextcloud.models.protocol.bot_config", mock_bot_config):
-            # Mock existing decisions
-            mock_decision1 = Mock()
-            mock_decision2 = Mock()
-
-            with patch.object(
-                Decision, "get_all", return_value=[mock_decision1, mock_decision2]
-            ):
+            with patch.object(Decision, "bulk_delete") as mock_bulk_delete:
                 # Mock the base class delete method
                 with patch.object(CouchDBModel, "delete"):
                     mock_protocol.delete()
 
                     # Verify decisions were deleted
-                    mock_decision1.delete.assert_called_once()
-                    mock_decision2.delete.assert_called_once()
+                    mock_bulk_delete.assert_called_once_with(
+                        selector={"page_id": mock_protocol.page_id}
+                    )
 
     def test_delete_with_no_decisions(self, mock_protocol, mock_bot_config):
         """Test that delete works when protocol has no associated decisions."""
         with patch("lib.nextcloud.models.protocol.bot_config", mock_bot_config):
-            with patch.object(Decision, "get_all", return_value=[]):
+            with patch.object(Decision, "bulk_delete", return_value=[]):
                 # Mock the base class delete method
                 with patch.object(CouchDBModel, "delete"):
                     # Should not raise an error
@@ -515,6 +736,122 @@ class TestProtocolDecisionKeywordVariations:
                 assert mock_decision_instance.objections in [None, ""]
 
 
+class TestFindDecisionBlocks:
+    """Test suite for scanning the ::: success blocks."""
+
+    def test_blocks_are_found_in_order(self):
+        """Test that all closed blocks are returned without their markers."""
+        content = "::: success\nA\n:::\ntext\n::: success B :::\n::: success\nC"
+
+        assert find_decision_blocks(content) == ["\nA\n", " B "]
+
+    def test_other_blocks_are_ignored(self):
+        """Test that blocks of other types are not returned."""
+        assert find_decision_blocks("::: warning\nA\n:::") == []
+
+
+class TestKeywordPrefixPattern:
+    """Test suite for the combined keyword prefix pattern."""
+
+    def test_longest_keyword_wins(self):
+        """Test that a keyword is not shadowed by a shorter keyword it starts with."""
+        pattern = keyword_prefix_pattern(("gültig", "gültig bis"))
+
+        m = pattern.match("Gültig bis: 2025-12-31")
+
+        assert m is not None
+        assert "Gültig bis: 2025-12-31"[m.end() :] == "2025-12-31"
+
+    def test_keywords_are_escaped(self):
+        """Test that regex metacharacters in keywords are matched literally."""
+        pattern = keyword_prefix_pattern(("moderator:in",))
+
+        assert pattern.match("Moderator:in: alice")
+        assert not pattern.match("Moderatorxin: alice")
+
+    def test_no_keywords_returns_none(self):
+        """Test that no pattern is compiled for an empty keyword list."""
+        assert keyword_prefix_pattern(()) is None
+
+
+class TestProtocolAISummary:
+    """Test suite for Protocol.generate_ai_summary()."""
+
+    def test_client_is_reused_across_summaries(self, mock_protocol, mock_page):
+        """Test that one Gemini client serves summaries of several protocols."""
+        mock_page.content = "Some protocol content"
+        mock_protocol.__dict__["page"] = mock_page
+        mock_client = MagicMock()
+        mock_client.models.generate_content.return_value.text = " Summary "
+
+        _genai_client.cache_clear()
+        with patch("lib.nextcloud.models.protocol.settings") as mock_settings:
+            mock_settings.gemini_api_key = "key"
+            with patch("google.genai.Client", return_value=mock_client) as MockClient:
+                mock_protocol.generate_ai_summary()
+                mock_protocol.generate_ai_summary()
+        _genai_client.cache_clear()
+
+        MockClient.assert_called_once_with(api_key="key")
+        assert mock_client.models.generate_content.call_count == 2
+        assert mock_protocol.ai_summary == "Summary"
+
+    def test_generate_summaries_for_several_protocols(self, mock_protocol):
+        """Test that summaries of all given protocols are generated."""
+        protocols = [mock_protocol.model_copy() for _ in range(3)]
+
+        with patch.object(Protocol, "generate_ai_summary") as mock_generate:
+            Protocol.generate_ai_summaries(protocols)
+
+        assert mock_generate.call_count == 3
+
+
+class TestProtocolNotifyMessage:
+    """Test suite for the message sent by Protocol.notify_updated()."""
+
+    def test_message_lists_persons_and_decisions(self, mock_protocol, mock_page):
+        """Test that the message contains the protocol details and decisions."""
+        mock_page.ocs.lastUserId = "carol"
+        mock_page.content = "Moderation: @alice"
+        mock_protocol.__dict__["page"] = mock_page
+        mock_protocol.moderated_by = ["alice"]
+        mock_protocol.protocol_by = ["bob"]
+        mock_protocol.participants = ["dave", "erin"]
+        decision = Decision(
+            title="Budget",
+            text="Approved",
+            objections="None",
+            valid_until="2025-12-31",
+            date="2024-11-07",
+        )
+
+        with patch("lib.nextcloud.models.protocol.NCUserList") as MockUserList:
+            MockUserList.return_value.get_user_by_uid.return_value = None
+            with patch("lib.nextcloud.models.protocol.send_message") as mock_send:
+                mock_protocol.notify_updated([decision])
+
+        message = mock_send.call_args_list[0].kwargs["text"]
+        assert mock_send.call_args_list[0].kwargs["channel"] == "@bob"
+        assert "\n---\n\nDate: 2024-11-07 Meeting\nLast update by: carol\n" in message
+        assert "Participants: dave, erin\n" in message
+        assert (
+            "- ✅ **Budget**\r  Approved\r  **Objections**: None"
+            "\r  **Valid until**: 2025-12-31\n"
+        ) in message
+
+    def test_no_message_without_recipient(self, mock_protocol, mock_page):
+        """Test that nothing is sent and no users are loaded without a recipient."""
+        mock_page.ocs.lastUserId = None
+        mock_protocol.__dict__["page"] = mock_page
+
+        with patch("lib.nextcloud.models.protocol.NCUserList") as MockUserList:
+            with patch("lib.nextcloud.models.protocol.send_message") as mock_send:
+                mock_protocol.notify_updated([])
+
+        MockUserList.assert_not_called()
+        mock_send.assert_not_called()
+
+
 class TestProtocolNotificationDateConstraints:
     """Test suite for Protocol notification date constraints."""
 
@@ -553,7 +890,7 @@ class TestProtocolNotificationDateConstraints:
             mock_page.content = protocol_page_content
 
             with patch.object(Protocol, "page", property(lambda self: mock_page)):
-                with patch.object(Decision, "get_all", return_value=[]):
+                with patch.object(Decision, "bulk_delete", return_value=[]):
                     with patch("lib.nextcloud.models.protocol.Group") as MockGroup:
                         MockGroup.get_for_page.return_value = mock_group
                         MockGroup.get.return_value = mock_group
@@ -624,7 +961,7 @@ class TestProtocolNotificationDateConstraints:
             mock_page.ocs.timestamp = now_ts
 
             with patch.object(Protocol, "page", property(lambda self: mock_page)):
-                with patch.object(Decision, "get_all", return_value=[]):
+                with patch.object(Decision, "bulk_delete", return_value=[]):
                     with patch("lib.nextcloud.models.protocol.Group") as MockGroup:
                         MockGroup.get_for_page.return_value = mock_group
                         MockGroup.get.return_value = mock_group
@@ -649,3 +986,65 @@ class TestProtocolNotificationDateConstraints:
 
                                 mock_protocol.update_from_page()
                                 mock_notify.assert_called_once()
+
+
+class TestProtocolPersonParsing:
+    """Test suite for parsing the persons from the protocol header."""
+
+    def _update(self, mock_protocol, mock_page, mock_bot_config, mock_group, content):
+        """Run update_from_page on the given content with all lookups mocked."""
+        with patch("lib.nextcloud.models.protocol.bot_config", mock_bot_config):
+            mock_page.title = "2024-11-07 Test Group"
+            mock_page.content = content
+
+            with patch.object(Protocol, "page", property(lambda self: mock_page)):
+                with patch.object(Decision, "bulk_delete", return_value=[]):
+                    with patch("lib.nextcloud.models.protocol.Group") as MockGroup:
+                        MockGroup.get_for_page.return_value = mock_group
+                        MockGroup.get.return_value = mock_group
+
+                        with patch.object(Protocol, "notify_updated"):
+                            with patch.object(CouchDBModel, "save"):
+                                mock_protocol.update_from_page()
+
+    def test_parse_persons(self, mock_protocol, mock_page, mock_bot_config, mock_group):
+        """Test that persons are assigned to their roles and sorted."""
+        content = """
+**Moderation:** mention://user/alice
+**Protokoll:** mention://user/bob
+**Teilnehmende:** mention://user/dave, mention://user/charlie
+mention://user/alice
+"""
+        self._update(mock_protocol, mock_page, mock_bot_config, mock_group, content)
+
+        assert mock_protocol.moderated_by == ["alice"]
+        assert mock_protocol.protocol_by == ["bob"]
+        assert mock_protocol.participants == ["charlie", "dave"]
+
+    @pytest.mark.parametrize("separator", ["---", "  ---  ", "# Agenda", "## Topic"])
+    def test_parse_stops_at_header_end(
+        self, mock_protocol, mock_page, mock_bot_config, mock_group, separator
+    ):
+        """Test that mentions after a heading or horizontal rule are ignored."""
+        content = f"""
+**Teilnehmende:** mention://user/charlie
+{separator}
+mention://user/eve
+"""
+        self._update(mock_protocol, mock_page, mock_bot_config, mock_group, content)
+
+        assert mock_protocol.participants == ["charlie"]
+
+    def test_configured_keywords_are_case_insensitive(
+        self, mock_protocol, mock_page, mock_bot_config, mock_group
+    ):
+        """Test that keywords configured with capitals still match."""
+        mock_bot_config.organisation = OrganisationConfig(
+            moderation_person_keywords=["Leitung"]
+        )
+        content = """
+Leitung: mention://user/alice
+"""
+        self._update(mock_protocol, mock_page, mock_bot_config, mock_group, content)
+
+        assert mock_protocol.moderated_by == ["alice"]
@@ -0,0 +1,59 @@
+"""Unit tests for sending Rocket.Chat messages."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from lib.outbound import rocketchat
+
+
+@pytest.fixture
+def mock_settings():
+    """Configure a webhook url without channel override."""
+    settings = MagicMock()
+    settings.rocketchat.hook_url = "https://chat.example.org/hooks/token"
+    settings.rocketchat.channel_overwrite = None
+    with patch("lib.outbound.rocketchat.settings", settings):
+        yield settings
+
+
+class TestSendMessage:
+    """Test suite for rocketchat.send_message()."""
+
+    def test_messages_are_posted_in_order(self, mock_settings):
+        """Test that queued messages are posted in the order they were sent."""
+        with patch.object(
+            rocketchat._session, "post", return_value=MagicMock(status_code=200)
+        ) as mock_post:
+            rocketchat.send_message("first", "@alice")
+            rocketchat.send_message("second", "general")
+            rocketchat.flush()
+
+        payloads = [c.kwargs["json"] for c in mock_post.call_args_list]
+        assert [(p["text"], p["channel"]) for p in payloads] == [
+            ("first", "@alice"),
+            ("second", "general"),
+        ]
+
+    def test_failed_post_does_not_stop_worker(self, mock_settings):
+        """Test that an error while posting does not drop later messages."""
+        with patch.object(
+            rocketchat._session,
+            "post",
+            side_effect=[ConnectionError(), MagicMock(status_code=200)],
+        ) as mock_post:
+            rocketchat.send_message("first", "general")
+            rocketchat.send_message("second", "general")
+            rocketchat.flush()
+
+        assert mock_post.call_count == 2
+
+    def test_nothing_is_posted_without_webhook(self, mock_settings):
+        """Test that messages are only logged when no webhook is configured."""
+        mock_settings.rocketchat.hook_url = None
+
+        with patch.object(rocketchat._session, "post") as mock_post:
+            rocketchat.send_message("text", "general")
+            rocketchat.flush()
+
+        mock_post.assert_not_called()
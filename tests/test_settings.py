@@ -0,0 +1,52 @@
+"""Unit tests for the settings models."""
+
+import pytest
+from pydantic import ValidationError
+
+from lib.settings import AuthSettings, RocketchatSettings
+
+
+class TestAuthSettings:
+    """Test suite for AuthSettings endpoint defaults."""
+
+    def test_endpoints_are_derived_from_provider(self):
+        """Test that unset endpoints are built from the provider base url."""
+        auth = AuthSettings(provider_base_url="https://auth.example.org/")
+
+        assert auth.authorization_endpoint == (
+            "https://auth.example.org/application/o/authorize/"
+        )
+        assert auth.token_endpoint == "https://auth.example.org/application/o/token/"
+        assert auth.userinfo_endpoint == (
+            "https://auth.example.org/application/o/userinfo/"
+        )
+        assert str(auth.authentik_base_url) == "https://auth.example.org/"
+
+    def test_configured_endpoints_are_kept(self):
+        """Test that explicitly configured endpoints are not overwritten."""
+        auth = AuthSettings(
+            provider_base_url="https://auth.example.org/",
+            token_endpoint="https://other.example.org/token",
+            authorization_endpoint="",
+        )
+
+        assert auth.token_endpoint == "https://other.example.org/token"
+        assert auth.authorization_endpoint.endswith("/application/o/authorize/")
+
+    def test_without_provider_endpoints_stay_empty(self):
+        """Test that nothing is derived without a provider base url."""
+        auth = AuthSettings()
+
+        assert auth.token_endpoint == ""
+        assert auth.authentik_base_url is None
+
+
+class TestFrozenSettings:
+    """Test suite for settings that must not change after startup."""
+
+    def test_rocketchat_settings_are_frozen(self):
+        """Test that assigning to a frozen settings model fails."""
+        rocketchat = RocketchatSettings(channel_overwrite="@alice")
+
+        with pytest.raises(ValidationError):
+            rocketchat.channel_overwrite = "@bob"
@@ -0,0 +1,182 @@
+"""Unit tests for loading Nextcloud users from CouchDB."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from lib.nextcloud.models.user import NCUser, NCUserList, OCSUser
+
+
+def user_doc(username: str, email: str, groups: list[str]) -> dict:
+    """Build a stored NCUser document."""
+    return {
+        "_id": f"NCUser:{username}",
+        "type": "NCUser",
+        "username": username,
+        "ocs": {"id": username, "email": email, "groups": groups},
+    }
+
+
+@pytest.fixture(autouse=True)
+def reset_user_cache():
+    """Clear the class level user caches before and after each test."""
+    NCUserList._cached_users = None
+    NCUserList._cached_users_by_group = {}
+    yield
+    NCUserList._cached_users = None
+    NCUserList._cached_users_by_group = {}
+
+
+@pytest.fixture
+def user_list():
+    """Load a user list from mocked CouchDB documents."""
+    docs = [
+        user_doc("alice", "alice@example.org", ["admin", "garden"]),
+        user_doc("bob", "bob@example.org", ["garden"]),
+        user_doc("carol", "carol@example.org", []),
+    ]
+    with patch("lib.nextcloud.models.base.find", return_value={"docs": docs}):
+        user_list = NCUserList()
+        user_list.load_users()
+    return user_list
+
+
+class TestNCUserList:
+    """Test suite for NCUserList lookups."""
+
+    def test_users_are_indexed_by_group(self, user_list):
+        """Test that users are grouped by their Nextcloud groups."""
+        assert [u.username for u in user_list.users_by_group["garden"]] == [
+            "alice",
+            "bob",
+        ]
+        assert "carol" not in {
+            u.username for users in user_list.users_by_group.values() for u in users
+        }
+
+    def test_users_are_loaded_on_first_access(self):
+        """Test that creating the list does not query CouchDB."""
+        with patch("lib.nextcloud.models.base.find", return_value={"docs": []}) as f:
+            user_list = NCUserList()
+            f.assert_not_called()
+
+            assert user_list.users == {}
+            f.assert_called_once()
+
+    def test_cached_instance_shares_group_index(self, user_list):
+        """Test that a new instance reuses the cached users and index."""
+        other = NCUserList()
+
+        assert other.users is user_list.users
+        assert other.users_by_group is user_list.users_by_group
+
+    def test_mails_for_groups(self, user_list):
+        """Test that mails of all users in the Nextcloud groups are returned."""
+        with patch(
+            "lib.nextcloud.models.user.Group.get_by_name", side_effect=ValueError
+        ):
+            emails = user_list.mails_for_groups(["garden", "unknown"])
+
+        assert emails == {"alice@example.org", "bob@example.org"}
+
+    def test_users_are_loaded_in_pages(self):
+        """Test that all users are loaded by following the bookmark."""
+        first = {
+            "docs": [user_doc(f"user{i}", "", []) for i in range(500)],
+            "bookmark": "next",
+        }
+        second = {"docs": [user_doc("last", "", [])], "bookmark": "end"}
+
+        with patch("lib.nextcloud.models.base.find", side_effect=[first, second]):
+            users = NCUserList().users
+
+        assert len(users) == 501
+        assert "last" in users
+
+    def test_stored_user_round_trip(self):
+        """Test that a dumped user is restored from its stored document."""
+        user = NCUser(
+            id="NCUser:alice",
+            username="alice",
+            ocs=OCSUser(id="alice", email="alice@example.org", displayname="Alice A"),
+        )
+        doc = user.model_dump() | {"_id": "NCUser:alice", "type": "NCUser"}
+
+        restored = NCUser.from_doc(doc)
+
+        assert restored == user
+        assert isinstance(restored.ocs, OCSUser)
+        assert str(restored) == "Alice A."
+
+    def test_stored_empty_quota_is_none(self):
+        """Test that an empty quota list in an old document is loaded as None."""
+        doc = user_doc("alice", "alice@example.org", [])
+        doc["ocs"]["quota"] = []
+
+        assert NCUser.from_doc(doc).ocs.quota is None
+
+    def test_stored_aliased_keys_are_mapped(self):
+        """Test that camelCase keys of a stored document fill their fields."""
+        doc = user_doc("alice", "alice@example.org", [])
+        doc["ocs"] |= {
+            "storageLocation": "/data/alice",
+            "lastLogin": 1700000000,
+            "backendCapabilities": {"setDisplayName": True},
+        }
+
+        ocs = NCUser.from_doc(doc).ocs
+
+        assert ocs.storage_location == "/data/alice"
+        assert ocs.last_login == 1700000000
+        assert ocs.backend_capabilities == {"setDisplayName": True}
+
+    def test_short_name_is_not_dumped(self):
+        """Test that the cached label does not end up in the stored document."""
+        user = NCUser(
+            username="bob",
+            ocs=OCSUser(id="bob", displayname="Bob Builder"),
+        )
+
+        assert str(user) == "Bob B."
+        assert "short_name" not in user.model_dump()
+        assert user == NCUser(
+            username="bob",
+            ocs=OCSUser(id="bob", displayname="Bob Builder"),
+        )
+
+    def test_update_from_nextcloud_saves_in_bulk(self, user_list):
+        """Test that fetched and disabled users are saved with one bulk request."""
+        response = MagicMock(status_code=200)
+        response.json.return_value = {
+            "ocs": {
+                "data": {
+                    "users": {
+                        "alice": {"id": "alice", "email": "alice@example.org"},
+                        "dave": {"id": "dave", "email": "dave@example.org"},
+                    }
+                }
+            }
+        }
+        db = MagicMock()
+        db.all.return_value = [
+            {"id": "NCUser:alice", "key": "NCUser:alice", "value": {"rev": "1-a"}},
+            {"key": "NCUser:dave", "error": "not_found"},
+        ]
+        db.save_bulk.side_effect = lambda docs, transaction: docs
+
+        with patch.object(NCUserList._session, "get", return_value=response):
+            with patch("lib.nextcloud.models.base.couchdb", return_value=db):
+                with patch.object(NCUserList, "load_users") as mock_load:
+                    user_list.update_from_nextcloud()
+
+        db.save_bulk.assert_called_once()
+        docs = {d["_id"]: d for d in db.save_bulk.call_args.args[0]}
+        assert docs["NCUser:alice"]["_rev"] == "1-a"
+        assert "_rev" not in docs["NCUser:dave"]
+        assert docs["NCUser:bob"]["ocs"]["enabled"] is False
+
+        # the cache is refreshed from the saved users without a reload
+        mock_load.assert_not_called()
+        assert user_list.users["dave"].ocs.email == "dave@example.org"
+        assert "carol" in user_list.users
+        assert NCUserList().users is user_list.users